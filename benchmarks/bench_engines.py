@@ -0,0 +1,285 @@
+"""Compare the bot's engines against the same local UCAM stand-in.
+
+    bot_v0   Selenium + JSON file   (headless Chrome, scripts not blocked, json: state file)
+    bot_v1   Selenium + MongoDB     (headless Chrome, scripts not blocked)
+    bot_v2   HTTP + MongoDB         (requests, the default engine)
+
+Each run starts a fresh stand-in, then the engine in a fresh interpreter,
+which logs in once, reads the running courses and polls --polls times; one
+course is published halfway through so one poll takes the full diff and
+notify path. Recorded per run:
+
+    cold start    interpreter start, imports, state store and (Selenium) Chrome start
+    login         login_ucam() until the course page can be fetched
+    poll          poll_account(), median and slowest
+    peak memory   the bot process's peak RSS, plus Chrome's peak PSS for Selenium
+    bytes         what the stand-in sent over the whole run, and what the engine counted as received
+
+bot_v0.py and bot_v1.py themselves cannot be pointed at another host, so
+their rows run the same storage layers and the Selenium engine with the
+legacy scripts' resource loading; they are a lower bound for those scripts,
+which also click through the menu and render images and stylesheets. MongoDB
+rows use a SQLite file unless --mongo is given, to keep network round trips
+to Atlas out of the comparison. Engines that need missing packages (selenium,
+webdriver-manager) are reported as skipped.
+
+Usage:
+    python benchmarks/bench_engines.py [--engines bot_v0,bot_v1,bot_v2] [--runs 3] [--polls 20]
+                                       [--latency MS] [--mongo] [--output engine_results.json] [--report engines.md]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENGINES = {
+    'bot_v0': {'label': 'Selenium + JSON file', 'fetch': 'selenium', 'state': 'json', 'block_scripts': False},
+    'bot_v1': {'label': 'Selenium + MongoDB', 'fetch': 'selenium', 'state': 'mongo', 'block_scripts': False},
+    'bot_v2': {'label': 'HTTP + MongoDB', 'fetch': 'http', 'state': 'mongo', 'block_scripts': True},
+}
+SELENIUM_PACKAGES = ['selenium', 'webdriver_manager']
+RESULT_PREFIX = 'ENGINE_RESULT '
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def delete_state(store, state_id):
+    """Remove the documents a run left under `state_id`."""
+    ops = {('courses', doc['_id']): None for doc in store.find('courses', state_id, ('_id',))}
+    ops[('bot_state', state_id)] = None
+    ops[('sessions', state_id)] = None
+    store.write(ops)
+
+def run_engine(name, url, state_spec, polls):
+    """Worker side: run one engine and print its measurements as one JSON line."""
+    from ucam_bot import browser, config, notify, poll, portal, storage
+    import requests
+
+    profile = ENGINES[name]
+    config.BASE_URL = url
+    config.TELEGRAM_API_URL = url
+    config.TELEGRAM_CHAT_INTERVAL_SECONDS = 0
+    config.FETCH_ENGINE = profile['fetch']
+    config.BROWSER_BLOCK_SCRIPTS = profile['block_scripts']
+    config.STATE_BACKEND = state_spec
+    config.SESSION_KEY = None
+    config.UCAM_RATE_PER_SECOND = 1e6
+    config.UCAM_BURST = 1e6
+
+    if not storage.check_store():
+        sys.exit(1)
+    if profile['fetch'] == 'selenium':
+        browser.shared_driver()
+    ready = time.time()
+
+    state_id = f'bench-{name}'
+    account = portal.UcamAccount(state_id, 'secret', 'bench-chat', state_id=state_id)
+    started = time.perf_counter()
+    if not portal.login_ucam(account):
+        raise Exception("could not log in to the stand-in")
+    login_seconds = time.perf_counter() - started
+
+    state = storage.load_bot_state(state_id)
+    poll.init_running_courses(account, state)
+    poll_seconds = []
+    for i in range(polls):
+        if i == polls // 2:
+            requests.post(f'{url}/__standin/publish', params={'user': account.user_id}, timeout=10)
+        started = time.perf_counter()
+        poll.poll_account(account, state)
+        poll_seconds.append(time.perf_counter() - started)
+
+    notify.shutdown_dispatcher()
+    storage.flush_state_writes()
+    browser.sample_memory()
+    if state_spec == 'mongo':
+        delete_state(storage.open_store(), state_id)
+    storage.close_store()
+    browser_peak = browser.browser_stats['peak_memory_mb'] or None
+    browser.close_browser()
+
+    print(RESULT_PREFIX + json.dumps({
+        'ready': ready,
+        'login_ms': login_seconds * 1000,
+        'poll_median_ms': statistics.median(poll_seconds) * 1000,
+        'poll_max_ms': max(poll_seconds) * 1000,
+        'bot_rss_mb': peak_rss_mb(),
+        'browser_mb': browser_peak,
+        'bytes_received': account.stats['bytes_received'],
+        'round_trips': account.stats['round_trips'],
+        'polls': polls,
+    }))
+
+def missing_packages(name):
+    if ENGINES[name]['fetch'] != 'selenium':
+        return []
+    return [package for package in SELENIUM_PACKAGES if importlib.util.find_spec(package) is None]
+
+def state_spec(name, workdir, use_mongo):
+    kind = ENGINES[name]['state']
+    if kind == 'json':
+        return f'json:{os.path.join(workdir, "running_state.json")}'
+    if use_mongo:
+        return 'mongo'
+    return f'sqlite:{os.path.join(workdir, "bot_state.db")}'
+
+def measure_engine(name, args):
+    """Run `name` once against a fresh stand-in. Returns its measurements."""
+    from ucam_standin import StandIn
+
+    standin = StandIn(rows=args.rows, running=args.running, latency=args.latency / 1000).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            spec = state_spec(name, workdir, args.mongo)
+            spawned = time.time()
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', name, '--url', standin.url,
+                 '--state', spec, '--polls', str(args.polls)],
+                cwd=ROOT, capture_output=True, text=True, timeout=args.timeout,
+            )
+            if args.verbose or process.returncode:
+                sys.stdout.write(process.stdout)
+                sys.stderr.write(process.stderr)
+            if process.returncode:
+                raise Exception(f"{name} exited with status {process.returncode}")
+            line = next(line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX))
+            result = json.loads(line[len(RESULT_PREFIX):])
+    finally:
+        standin.stop()
+    stats = standin.snapshot()
+    result['state'] = spec.split(':', 1)[0]
+    result['cold_start_ms'] = (result.pop('ready') - spawned) * 1000
+    result['peak_memory_mb'] = result['bot_rss_mb'] + (result['browser_mb'] or 0)
+    result['bytes_sent'] = stats.get('bytes_sent', 0)
+    result['requests'] = stats.get('requests', 0)
+    result['telegram_messages'] = stats.get('telegram_messages', 0)
+    return result
+
+def summarise(runs):
+    """Median of every numeric field over the runs."""
+    summary = {}
+    for field, value in runs[0].items():
+        values = [run[field] for run in runs if run[field] is not None]
+        if isinstance(value, (int, float)) and values:
+            summary[field] = statistics.median(values)
+        else:
+            summary[field] = value
+    summary['runs'] = len(runs)
+    return summary
+
+def format_report(results, args):
+    lines = [
+        f"Engines against the UCAM stand-in: {args.rows} course rows, {args.latency:.0f} ms latency, "
+        f"{args.polls} polls per run, median of {args.runs} runs.",
+        "",
+        "| Engine | Fetch + state | Cold start | Login | Poll (median / max) | Peak memory | Bytes sent |",
+        "|--------|---------------|------------|-------|---------------------|-------------|------------|",
+    ]
+    proxies = [name for name in results if ENGINES[name]['fetch'] == 'selenium']
+    for name, result in results.items():
+        label = f"{ENGINES[name]['label']} ({result['state']})" if 'state' in result else ENGINES[name]['label']
+        if name in proxies:
+            name = f"{name} (proxy)"
+        if 'skipped' in result:
+            lines.append(f"| {name} | {label} | skipped: {result['skipped']} | | | | |")
+            continue
+        memory = f"{result['peak_memory_mb']:.0f} MB"
+        if result['browser_mb']:
+            memory += f" ({result['bot_rss_mb']:.0f} bot + {result['browser_mb']:.0f} Chrome)"
+        lines.append(
+            f"| {name} | {label} | {result['cold_start_ms']:.0f} ms | {result['login_ms']:.0f} ms "
+            f"| {result['poll_median_ms']:.1f} / {result['poll_max_ms']:.1f} ms | {memory} "
+            f"| {result['bytes_sent'] / 1024:.0f} KB |"
+        )
+    if proxies:
+        lines += [
+            "",
+            f"{', '.join(proxies)} (proxy): ucam_bot's Selenium engine with scripts unblocked, not the legacy "
+            f"scripts themselves, which also click through the menu and load images and stylesheets.",
+        ]
+    return '\n'.join(lines) + '\n'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--engines', default=','.join(ENGINES), help="comma-separated engines to run")
+    parser.add_argument('--runs', type=int, default=3, help="runs per engine; the report shows medians")
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=40, help="course rows on the stand-in's page")
+    parser.add_argument('--running', type=int, default=4, help="courses without a grade")
+    parser.add_argument('--latency', type=float, default=50, help="ms the stand-in adds to every response")
+    parser.add_argument('--mongo', action='store_true',
+                        help="use MONGO_URI for the MongoDB engines instead of a SQLite file (documents are removed afterwards)")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds one run may take")
+    parser.add_argument('--output', default='engine_results.json', help="where to write the results (JSON)")
+    parser.add_argument('--report', help="also write the comparison table (Markdown) here")
+    parser.add_argument('--verbose', action='store_true', help="show the engines' own output")
+    parser.add_argument('--worker', choices=list(ENGINES), help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    parser.add_argument('--state', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_engine(args.worker, args.url, args.state, args.polls)
+        return
+
+    names = [name.strip() for name in args.engines.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)} (choose from {', '.join(ENGINES)})")
+    if args.mongo and not os.getenv('MONGO_URI'):
+        parser.error("--mongo needs MONGO_URI in the environment")
+
+    results = {}
+    failed = False
+    for name in names:
+        missing = missing_packages(name)
+        if missing:
+            print(f"⏭️ {name}: skipped, {', '.join(missing)} not installed")
+            results[name] = {'skipped': f"{', '.join(missing)} not installed"}
+            continue
+        runs = []
+        for run in range(1, args.runs + 1):
+            try:
+                result = measure_engine(name, args)
+            except Exception as e:
+                print(f"❌ {name} run {run}: {e}")
+                failed = True
+                break
+            runs.append(result)
+            print(f"  {name} run {run}: cold start {result['cold_start_ms']:.0f} ms, login {result['login_ms']:.0f} ms, "
+                  f"poll {result['poll_median_ms']:.1f} ms, peak {result['peak_memory_mb']:.0f} MB, "
+                  f"{result['bytes_sent'] / 1024:.0f} KB sent")
+        if runs:
+            results[name] = summarise(runs)
+
+    report = format_report(results, args)
+    print()
+    print(report)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'python': sys.version.split()[0],
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'settings': {name: getattr(args, name) for name in ('rows', 'running', 'latency', 'polls', 'runs', 'mongo')},
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"Report written to {args.report}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Compare the old BeautifulSoup login with ucam_bot.login.
+
+First times hidden-field extraction on a synthetic Login.aspx: the old
+BeautifulSoup pass, the full regex scan and the cached-template lookup. Then
+logs in repeatedly against a local fake portal running in a separate
+process and reports wall time, client CPU time and requests per login, once
+with the mmi in the post-login redirect and once with it only on the
+landing page.
+
+Usage:
+    python benchmarks/bench_login.py [--logins N] [--latency MS]
+"""
+import argparse
+import http.server
+import multiprocessing
+import os
+import re
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from ucam_bot import config, login
+from fixtures import dashboard_page, login_page
+
+MMI = '4f6a7b8c9d'
+
+def legacy_hidden_fields(page_html):
+    """Hidden-field extraction as login_ucam did it before ucam_bot.login."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page_html, 'lxml')
+    form_data = {}
+    for hidden_input in soup.find_all('input', {'type': 'hidden'}):
+        name = hidden_input.get('name')
+        value = hidden_input.get('value', '')
+        if name:
+            form_data[name] = value
+    return form_data
+
+def legacy_log_in(session, user_id, password):
+    """The old login: full parse, redirects followed, success judged by keywords in the body."""
+    login_url = f'{config.BASE_URL}/Security/Login.aspx'
+    response = session.get(login_url, timeout=10, allow_redirects=True)
+    response.raise_for_status()
+    form_data = legacy_hidden_fields(response.text)
+    form_data['ctl00$logMain$UserName'] = user_id
+    form_data['ctl00$logMain$Password'] = password
+    form_data['ctl00$logMain$Button1'] = 'Sign In'
+    response = session.post(login_url, data=form_data, timeout=10, allow_redirects=True)
+    response.raise_for_status()
+    mmi = None
+    if 'mmi=' in response.text:
+        match = re.search(r'mmi=([a-zA-Z0-9]+)', response.text)
+        if match:
+            mmi = match.group(1)
+    if 'dashboard' in response.text.lower() or 'logout' in response.text.lower() or 'course' in response.text.lower():
+        return mmi
+    raise Exception("Authentication may have failed")
+
+def serve(port_queue, latency, mmi_in_redirect):
+    """Run a fake Login.aspx / Dashboard.aspx portal until killed."""
+    login_html = login_page().encode()
+    dashboard_html = dashboard_page(MMI).encode()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, code, body=b'', headers=()):
+            time.sleep(latency)
+            self.send_response(code)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/Security/Login.aspx'):
+                return self.reply(200, login_html, [('Set-Cookie', 'ASP.NET_SessionId=abc; Path=/')])
+            if self.path.startswith('/Dashboard.aspx'):
+                return self.reply(200, dashboard_html)
+            self.reply(404)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            location = f'/Dashboard.aspx?mmi={MMI}' if mmi_in_redirect else '/Dashboard.aspx'
+            self.reply(302, b'', [('Location', location), ('Set-Cookie', '.ASPXAUTH=ok; Path=/')])
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+def time_logins(log_in, logins):
+    """Log in `logins` times on fresh sessions. Returns (wall ms, CPU ms, requests) per login."""
+    counted = []
+    session = requests.Session()
+    session.hooks['response'].append(lambda response, *args, **kwargs: counted.append(1))
+    log_in(session, 'bench', 'secret')  # warm up: connection, template, lazy imports
+    counted.clear()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(logins):
+        session.cookies.clear()
+        if log_in(session, 'bench', 'secret') != MMI:
+            print("❌ login did not return the expected mmi")
+            sys.exit(1)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    return wall * 1000 / logins, cpu * 1000 / logins, len(counted) / logins
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0, help="server delay per response in ms")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    page = login_page()
+    url = 'https://ucam.uiu.ac.bd/Security/Login.aspx'
+    expected = legacy_hidden_fields(page)
+    # The first login_form_data() call scans the page, the second uses the template
+    if login.extract_hidden_fields(page) != expected or login.login_form_data(page, url)[1] != expected:
+        print("❌ hidden fields differ from BeautifulSoup's")
+        sys.exit(1)
+    if login.login_form_data(page, url)[1] != expected:
+        print("❌ cached template disagrees with the full scan")
+        sys.exit(1)
+
+    number = 50
+    timings = [
+        ('BeautifulSoup (old)', lambda: legacy_hidden_fields(page)),
+        ('regex scan', lambda: login.extract_hidden_fields(page)),
+        ('cached template', lambda: login.login_form_data(page, url)),
+    ]
+    print(f"Hidden-field extraction on a {len(page) / 1024:.1f} KB Login.aspx")
+    baseline = None
+    for name, fn in timings:
+        best = min(timeit.repeat(fn, repeat=args.repeat, number=number)) / number
+        baseline = baseline or best
+        print(f"  {name:<20} {best * 1000:>8.3f} ms {baseline / best:>7.1f}x")
+
+    print(f"\n{args.logins} logins per engine, {args.latency:.0f} ms server latency")
+    print(f"{'scenario':<24} {'engine':<8} {'wall ms':>9} {'CPU ms':>8} {'requests':>9}")
+    context = multiprocessing.get_context('fork')
+    for scenario, mmi_in_redirect in (('mmi in redirect', True), ('mmi on landing page', False)):
+        ports = context.Queue()
+        server = context.Process(target=serve, args=(ports, args.latency / 1000, mmi_in_redirect), daemon=True)
+        server.start()
+        config.BASE_URL = f'http://127.0.0.1:{ports.get(timeout=10)}'
+        try:
+            for engine, log_in in (('old', legacy_log_in), ('new', login.log_in)):
+                wall, cpu, round_trips = time_logins(log_in, args.logins)
+                print(f"{scenario:<24} {engine:<8} {wall:>9.2f} {cpu:>8.2f} {round_trips:>9.1f}")
+        finally:
+            server.kill()
+
+if __name__ == '__main__':
+    main()
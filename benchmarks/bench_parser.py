@@ -0,0 +1,50 @@
+"""Compare the BeautifulSoup and lxml course table parsers.
+
+Checks that both backends return identical course lists, then times them on
+synthetic multi-year course histories.
+
+Usage:
+    python benchmarks/bench_parser.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucam_bot.parser import extract_courses_bs4, extract_courses_lxml
+from fixtures import course_history_page, make_courses
+
+ROW_COUNTS = [8, 40, 120, 300, 600]
+
+def best_of(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>5} {'page KB':>8} {'bs4 ms':>9} {'lxml ms':>9} {'lxml+filter ms':>15} {'speedup':>8}")
+    for n_rows in ROW_COUNTS:
+        page = course_history_page(n_rows)
+        running_trimester = make_courses(n_rows)[-1]['Trimester']
+
+        expected = extract_courses_bs4(page)
+        if extract_courses_lxml(page) != expected:
+            print(f"❌ lxml backend disagrees with bs4 on {n_rows} rows")
+            sys.exit(1)
+        if extract_courses_lxml(page, [running_trimester]) != extract_courses_bs4(page, [running_trimester]):
+            print(f"❌ trimester filter disagrees with bs4 on {n_rows} rows")
+            sys.exit(1)
+
+        number = max(1, 200 // n_rows)
+        bs4_time = best_of(lambda: extract_courses_bs4(page), args.repeat, number)
+        lxml_time = best_of(lambda: extract_courses_lxml(page), args.repeat, number)
+        filtered_time = best_of(lambda: extract_courses_lxml(page, [running_trimester]), args.repeat, number)
+        print(f"{n_rows:>5} {len(page) / 1024:>8.1f} {bs4_time * 1000:>9.2f} {lxml_time * 1000:>9.2f} "
+              f"{filtered_time * 1000:>15.2f} {bs4_time / lxml_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Guard the bot's cold start.
+
+Imports ucam_bot.cli in fresh interpreters, reports the best import time and
+fails if it exceeds the budget or if a dependency that should load lazily
+(pymongo, bs4, dotenv, cryptography) is imported up front.
+
+Then runs `bot_v2.py --once` against the local UCAM stand-in (see
+ucam_standin.py) with a SQLite state file and fails if the time from
+starting the interpreter to the end of the first poll exceeds its budget.
+The first run fills the state and is not counted; the measured runs take
+the usual path of a cron run: log in, load state, poll once, exit.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--max-import-ms MS] [--max-first-poll-ms MS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LAZY_MODULES = ['pymongo', 'bs4', 'dotenv', 'cryptography']
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import ucam_bot.cli
+elapsed = time.perf_counter() - started
+print(json.dumps({'import_ms': elapsed * 1000, 'loaded': [m for m in %r if m in sys.modules]}))
+''' % (LAZY_MODULES,)
+
+COLD_START_LINE = 'Cold start'
+
+def probe():
+    output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT)
+    return json.loads(output)
+
+def first_poll(url, state_path):
+    """Run bot_v2.py --once against the stand-in. Returns seconds from spawn until the first poll was done."""
+    env = dict(
+        os.environ,
+        UCAM_BASE_URL=url,
+        TELEGRAM_API_URL=url,
+        TELEGRAM_BOT_TOKEN='startup',
+        TELEGRAM_CHAT_ID='startup-chat',
+        USER_ID='startup',
+        PASSWORD='secret',
+        STATE_BACKEND=f'sqlite:{state_path}',
+        SESSION_KEY='',
+        METRICS_PORT='',
+        METRICS_FILE='',
+        PYTHONUNBUFFERED='1',
+    )
+    spawned = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'bot_v2.py'), '--once'], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    elapsed = None
+    output = []
+    for line in process.stdout:
+        output.append(line)
+        if elapsed is None and COLD_START_LINE in line:
+            elapsed = time.perf_counter() - spawned
+    if process.wait() or elapsed is None:
+        sys.stdout.write(''.join(output))
+        raise Exception(f"bot_v2.py --once exited with status {process.returncode}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=400,
+                        help="fail if importing ucam_bot.cli takes longer than this (default: 400)")
+    parser.add_argument('--max-first-poll-ms', type=float, default=600,
+                        help="fail if bot_v2.py --once takes longer than this to finish its first poll (default: 600)")
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(args.runs)]
+    best = min(r['import_ms'] for r in results)
+    loaded = sorted({m for r in results for m in r['loaded']})
+
+    print(f"import ucam_bot.cli: best {best:.1f} ms over {args.runs} runs (budget {args.max_import_ms:.0f} ms)")
+    failed = False
+    if loaded:
+        print(f"❌ Imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if best > args.max_import_ms:
+        print("❌ Import time over budget")
+        failed = True
+
+    from ucam_standin import StandIn
+    standin = StandIn().start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            state_path = os.path.join(workdir, 'startup_state.db')
+            # Fills the state, so the measured runs take the poll path
+            first_poll(standin.url, state_path)
+            best_poll = min(first_poll(standin.url, state_path) for _ in range(args.runs))
+    finally:
+        standin.stop()
+    print(f"bot_v2.py --once: first poll done {best_poll * 1000:.0f} ms after start, best of {args.runs} runs "
+          f"(budget {args.max_first_poll_ms:.0f} ms)")
+    if best_poll * 1000 > args.max_first_poll_ms:
+        print("❌ Time to first poll over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+if __name__ == '__main__':
+    main()
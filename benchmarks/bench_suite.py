@@ -0,0 +1,200 @@
+"""Benchmark the poll hot path and check it against a baseline.
+
+Times, on course histories of 5 to 600 rows (plus any anonymised pages in
+benchmarks/pages/):
+
+    extract_courses       parse the course table (PARSER_BACKEND=lxml)
+    course_key matching   index_courses() and diff_courses() of running vs. scraped courses,
+                          and of the whole table against itself
+    messages              get_message_for_course() for every graded row
+    state serialisation   the per-course write operations and their JSON, as sent to the store
+    poll                  one poll_account() against the local UCAM stand-in, with an
+                          unchanged table (fingerprint hit) and a changed one (full diff)
+
+Each case reports the median and fastest time per call and the peak
+memory allocated by one call (tracemalloc). Results are written as JSON.
+With --baseline, any case whose fastest time is more than --threshold
+slower than the baseline's fails the run.
+
+Usage:
+    python benchmarks/bench_suite.py [--output results.json] [--baseline old.json] [--threshold 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucam_bot import config
+from fixtures import course_history_page, recorded_pages
+
+ROW_COUNTS = [5, 40, 120, 300, 600]
+POLL_ROW_COUNTS = [40, 600]
+
+def measure(fn, repeat, target_seconds=0.05):
+    """Time fn(). Returns {'median_ms', 'min_ms', 'peak_kb', 'calls'}."""
+    fn()
+    started = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - started, 1e-7)
+    number = max(1, int(target_seconds / once))
+    times = [t / number for t in timeit.repeat(fn, repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'median_ms': statistics.median(times) * 1000,
+        'min_ms': min(times) * 1000,
+        'peak_kb': peak / 1024,
+        'calls': number * repeat,
+    }
+
+def page_cases():
+    """[(label, rows, page_html)] for synthetic and recorded pages."""
+    from ucam_bot.parser import extract_courses
+    cases = [(f'{rows} rows', rows, course_history_page(rows)) for rows in ROW_COUNTS]
+    for name, page_html in recorded_pages():
+        cases.append((f'recorded {name}', len(extract_courses(page_html)), page_html))
+    return cases
+
+def hot_path_benchmarks(repeat):
+    from ucam_bot.diff import diff_courses, has_grade, index_courses
+    from ucam_bot.messages import get_message_for_course
+    from ucam_bot.parser import extract_courses, table_fingerprint
+    from ucam_bot.poll import running_courses_in
+    from ucam_bot.storage import _course_ops
+
+    results = {}
+    for label, rows, page_html in page_cases():
+        courses = extract_courses(page_html)
+        running = running_courses_in(courses)
+        # A poll compares the courses it waits on with the rows from their trimesters
+        trimesters = {c['Trimester'].strip() for c in running}
+        scraped = extract_courses(page_html, trimesters)
+        graded = [c for c in courses if has_grade(c)]
+        cases = {
+            'extract_courses': lambda: extract_courses(page_html),
+            'extract_courses (running trimesters)': lambda: extract_courses(page_html, trimesters),
+            'table_fingerprint': lambda: table_fingerprint(page_html),
+            'course_key matching': lambda: diff_courses(index_courses(running), index_courses(scraped)),
+            'course_key matching (all rows)': lambda: diff_courses(index_courses(courses), index_courses(courses)),
+            'messages': lambda: [get_message_for_course(c, c['Grade'].strip(), float(c['Point'])) for c in graded],
+            'state serialisation': lambda: [json.dumps(update) for _, _, update in _course_ops('bench', courses)],
+        }
+        for name, fn in cases.items():
+            result = measure(fn, repeat)
+            result['rows'] = rows
+            results[f'{name} | {label}'] = result
+            print(f"  {name:<38} {label:<16} {result['median_ms']:>9.3f} ms {result['peak_kb']:>9.1f} KB")
+    return results
+
+def poll_benchmarks(repeat, workdir):
+    """Time poll_account() against the stand-in, with state in a SQLite file."""
+    from ucam_standin import StandIn
+    from ucam_bot import poll, portal, storage
+
+    config.UCAM_RATE_PER_SECOND = 1e6
+    config.UCAM_BURST = 1e6
+    config.STATE_BACKEND = f'sqlite:{os.path.join(workdir, "bench_state.db")}'
+    config.SESSION_KEY = None
+    results = {}
+    for rows in POLL_ROW_COUNTS:
+        standin = StandIn(rows=rows, running=4).start()
+        config.BASE_URL = standin.url
+        try:
+            account = portal.UcamAccount(f'bench{rows}', 'secret', 'chat', state_id=f'bench{rows}')
+            if not portal.login_ucam(account):
+                raise Exception("could not log in to the stand-in")
+            state = storage.load_bot_state(account.state_id)
+            poll.init_running_courses(account, state)
+
+            def changed_table():
+                state['table_fingerprint'] = None
+                poll.poll_account(account, state)
+
+            cases = {
+                'poll (table unchanged)': lambda: poll.poll_account(account, state),
+                'poll (table changed)': changed_table,
+            }
+            for name, fn in cases.items():
+                result = measure(fn, repeat, target_seconds=0.2)
+                result['rows'] = rows
+                results[f'{name} | {rows} rows'] = result
+                print(f"  {name:<38} {f'{rows} rows':<16} {result['median_ms']:>9.3f} ms {result['peak_kb']:>9.1f} KB")
+        finally:
+            standin.stop()
+    storage.flush_state_writes()
+    storage.close_store()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print cases slower than the baseline by more than `threshold` and `min_delta_ms`. Returns their names."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        # The fastest run is the least disturbed by other load on the machine
+        change = result['min_ms'] / max(old['min_ms'], 1e-9) - 1
+        if change > threshold and result['min_ms'] - old['min_ms'] > min_delta_ms:
+            regressions.append(name)
+            print(f"❌ {name}: {old['min_ms']:.3f} ms -> {result['min_ms']:.3f} ms (+{change:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_results.json', help="where to write the results (JSON)")
+    parser.add_argument('--baseline', help="results file from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="fail if a case is this much slower than the baseline (default 0.25 = 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help="ignore slowdowns smaller than this many ms, which are timer noise (default 0.05)")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--skip-poll', action='store_true', help="leave out the stand-in poll cycle")
+    args = parser.parse_args()
+
+    print(f"{'case':<40} {'fixture':<16} {'median':>12} {'peak alloc':>12}")
+    results = hot_path_benchmarks(args.repeat)
+    if not args.skip_poll:
+        with tempfile.TemporaryDirectory() as workdir:
+            results.update(poll_benchmarks(args.repeat, workdir))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} cases regressed more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"✅ No case more than {args.threshold:.0%} slower than {args.baseline}")
+
+if __name__ == '__main__':
+    main()
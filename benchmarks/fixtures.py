@@ -0,0 +1,161 @@
+"""Synthetic StudentCourseHistory.aspx pages for benchmarks.
+
+The pages mimic the real portal: a large __VIEWSTATE, navigation menu and
+scripts around the ctl00_MainContainer_gvRegisteredCourse GridView.
+Anonymised copies of real pages (see record_page.py) in benchmarks/pages/
+are used alongside them.
+"""
+import os
+import random
+import re
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+HEADERS = ['SL', 'Course ID', 'Course Name', 'Trimester', 'Credit', 'Course Status', 'Grade', 'Point']
+
+GRADES = [
+    ('A', '4.00'), ('A-', '3.67'), ('B+', '3.33'), ('B', '3.00'), ('B-', '2.67'),
+    ('C+', '2.33'), ('C', '2.00'), ('C-', '1.67'), ('D+', '1.33'), ('D', '1.00'), ('F', '0.00'),
+]
+
+def trimester_codes(count, first_year=20):
+    """Return `count` consecutive UIU trimester codes, e.g. 201, 202, 203, 211..."""
+    codes = []
+    year, term = first_year, 1
+    while len(codes) < count:
+        codes.append(f'{year}{term}')
+        term += 1
+        if term > 3:
+            year, term = year + 1, 1
+    return codes
+
+def make_courses(n_rows, running=4, seed=0):
+    """Return n_rows course dicts spread over trimesters; the last `running` have no grade yet."""
+    rng = random.Random(seed)
+    trimesters = trimester_codes(max(1, (n_rows + 3) // 4))
+    courses = []
+    for i in range(n_rows):
+        grade, point = rng.choice(GRADES)
+        is_running = i >= n_rows - running
+        courses.append({
+            'SL': str(i + 1),
+            'Course ID': f'CSE {1000 + i}',
+            'Course Name': f'Course Number {i} of the Curriculum',
+            'Trimester': trimesters[min(i // 4, len(trimesters) - 1)],
+            'Credit': rng.choice(['1.00', '3.00']),
+            'Course Status': 'Running Course' if is_running else 'Completed',
+            'Grade': '' if is_running else grade,
+            'Point': '' if is_running else point,
+        })
+    return courses
+
+def render_table(courses):
+    """Render courses as the GridView markup ASP.NET produces."""
+    parts = ['<table cellspacing="0" rules="all" class="table table-bordered" border="1" '
+             'id="ctl00_MainContainer_gvRegisteredCourse" style="border-collapse:collapse;">\n',
+             '\t<tr>\n']
+    for header in HEADERS:
+        parts.append(f'\t\t<th scope="col">{header}</th>')
+    parts.append('\n\t</tr>')
+    for course in courses:
+        parts.append('<tr>\n')
+        for header in HEADERS:
+            value = course.get(header, '')
+            if header == 'Course Name':
+                value = f'<span id="lbl{course["SL"]}">{value}</span>'
+            parts.append(f'\t\t<td>\n                {value}&nbsp;\n            </td>')
+        parts.append('\n\t</tr>')
+    parts.append('\n</table>')
+    return ''.join(parts)
+
+def make_page(courses, viewstate_bytes=60000, menu_items=120):
+    """Wrap a course table in a full portal page."""
+    viewstate = ('dDwtMTA4MzUxNjk0Mjt0PDtsPGk8MT47PjtsPHQ8O2w8aTwxPjs+' * (viewstate_bytes // 52 + 1))[:viewstate_bytes]
+    menu = ''.join(
+        f'<li><a href="/Student/Page{i}.aspx?mmi=4f6a7b8c9d{i}">Menu entry {i}</a>'
+        f'<ul><li><a href="#">Sub entry {i}</a></li></ul></li>'
+        for i in range(menu_items)
+    )
+    return (
+        '<!DOCTYPE html>\n<html xmlns="http://www.w3.org/1999/xhtml">\n<head>'
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8" />'
+        '<title>Student Course History</title>'
+        + '<script type="text/javascript">//<![CDATA[\nvar theForm = document.forms[0];\n//]]></script>' * 20
+        + '<link href="/Content/site.css" rel="stylesheet" /></head>\n<body>'
+        '<form method="post" action="./StudentCourseHistory.aspx?mmi=4f6a7b8c9d" id="aspnetForm">'
+        f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{viewstate}" />'
+        '<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="/wEWAgL+raDpAgKM54rGBg==" />'
+        f'<div class="nav"><ul class="menu">{menu}</ul></div>'
+        '<div class="content"><div class="panel">'
+        + render_table(courses)
+        + '</div></div><div class="footer">United International University</div>'
+        '</form></body></html>'
+    )
+
+def course_history_page(n_rows, running=4, seed=0):
+    """Shortcut: a full page with n_rows synthetic courses."""
+    return make_page(make_courses(n_rows, running=running, seed=seed))
+
+def login_page(viewstate_bytes=8000, scripts=30):
+    """A Login.aspx page: the ASP.NET hidden fields, the login box and the usual scripts."""
+    viewstate = ('/wEPDwUKMTY1NDU2MTA1Mg9kFgJmD2QWAgIDD2QWAgIBD2QWAgIB' * (viewstate_bytes // 52 + 1))[:viewstate_bytes]
+    hidden = [
+        ('__LASTFOCUS', ''), ('__EVENTTARGET', ''), ('__EVENTARGUMENT', ''),
+        ('__VIEWSTATE', viewstate), ('__VIEWSTATEGENERATOR', 'C2EE9ABB'),
+        ('__EVENTVALIDATION', '/wEdAAWf8L+3cL2ZxRgMkZ8c3Pn7Qm1B4eP3o2Jt1w=='),
+    ]
+    return (
+        '<!DOCTYPE html>\n<html xmlns="http://www.w3.org/1999/xhtml">\n<head>'
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><title>UCAM | Login</title>'
+        + '<script type="text/javascript" src="/Scripts/jquery.min.js"></script>' * scripts
+        + '<link href="/Content/login.css" rel="stylesheet" /></head>\n<body>'
+        '<form method="post" action="./Login.aspx" id="aspnetForm">'
+        + ''.join(f'<input type="hidden" name="{name}" id="{name}" value="{value}" />\n' for name, value in hidden)
+        + '<div class="login-box"><h3>Sign in to UCAM</h3>'
+        '<input name="ctl00$logMain$UserName" type="text" id="ctl00_logMain_UserName" class="form-control" />'
+        '<input name="ctl00$logMain$Password" type="password" id="ctl00_logMain_Password" class="form-control" />'
+        '<input type="submit" name="ctl00$logMain$Button1" value="Sign In" id="ctl00_logMain_Button1" class="btn" />'
+        '</div><div class="footer">United International University</div>'
+        '</form></body></html>'
+    )
+
+def dashboard_page(mmi='4f6a7b8c9d', menu_items=120):
+    """The page UCAM lands on after login, with mmi links in its menu."""
+    menu = ''.join(
+        f'<li><a href="/Student/Page{i}.aspx?mmi={mmi}">Menu entry {i}</a></li>' for i in range(menu_items)
+    )
+    return (
+        '<!DOCTYPE html>\n<html><head><title>Dashboard</title></head><body>'
+        f'<ul class="menu">{menu}</ul><a href="/Security/Logout.aspx">Logout</a>'
+        '<div class="content">Welcome to your dashboard</div></body></html>'
+    )
+
+STUDENT_ID = re.compile(r'\b0\d{9}\b')
+HIDDEN_VALUE = re.compile(r'(<input[^>]+type="hidden"[^>]+value=")([^"]*)(")', re.I)
+NAME_SPAN = re.compile(r'(<span[^>]+id="[^"]*(?:Name|Email|Mobile|Phone)[^"]*"[^>]*>)([^<]*)(</span>)')
+
+def anonymise_page(page_html, seed=0):
+    """Strip personal data from a saved portal page, keeping its size and structure.
+
+    Hidden field values are replaced with random text of the same length,
+    mmi values and 10-digit student ids are masked, and spans labelled as a
+    name, email or phone number are blanked. Course rows are kept.
+    """
+    rng = random.Random(seed)
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+    page_html = HIDDEN_VALUE.sub(
+        lambda m: m.group(1) + ''.join(rng.choice(alphabet) for _ in m.group(2)) + m.group(3), page_html)
+    page_html = re.sub(r'mmi=[a-zA-Z0-9]+', 'mmi=4f6a7b8c9d', page_html)
+    page_html = STUDENT_ID.sub('0110000000', page_html)
+    return NAME_SPAN.sub(lambda m: m.group(1) + 'Student' + m.group(3), page_html)
+
+def recorded_pages(directory=PAGES_DIR):
+    """Return [(name, html)] for the anonymised pages saved in `directory`."""
+    if not os.path.isdir(directory):
+        return []
+    pages = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.html'):
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                pages.append((filename[:-len('.html')], f.read()))
+    return pages
@@ -0,0 +1,98 @@
+"""Profile poll cycles offline against the UCAM stand-in.
+
+Starts the stand-in in a separate process, so its request handling stays out
+of the profile, logs in and runs ucam_bot.profiling.profile_polls(): --polls
+polls under cProfile and the stack sampler, then as many under tracemalloc.
+One course is published halfway through each pass so the notify path is
+profiled too. Every poll parses and diffs the whole table unless --unchanged
+is given. Reports (hotspots.txt, stacks.folded, allocations.txt,
+profile.pstats, summary.json) go to --output; see ucam_bot/profiling.py.
+
+To profile against the portal configured in .env instead:
+    python bot_v2.py --profile 50
+
+Usage:
+    python benchmarks/profile_poll.py [--polls 50] [--rows 120] [--page NAME] [--latency MS]
+                                      [--state sqlite:profile.db] [--unchanged] [--output profile]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucam_bot import config
+from ucam_bot.cli import positive_int
+from fixtures import recorded_pages
+
+def serve(url_queue, rows, running, latency, page):
+    """Run the stand-in until the process is killed."""
+    from ucam_standin import StandIn
+    standin = StandIn(rows=rows, running=running, latency=latency, page=page).start()
+    url_queue.put(standin.url)
+    threading.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=positive_int, default=50, help="polls per pass (default: 50)")
+    parser.add_argument('--rows', type=int, default=120, help="course rows on the synthetic page")
+    parser.add_argument('--running', type=int, default=4, help="courses without a grade")
+    parser.add_argument('--page', help="profile on this recorded page from benchmarks/pages/ instead")
+    parser.add_argument('--latency', type=float, default=0, help="ms the stand-in adds to every response")
+    parser.add_argument('--state', help="STATE_BACKEND to write to (default: a temporary SQLite file)")
+    parser.add_argument('--unchanged', action='store_true',
+                        help="keep the table fingerprint, so unchanged tables skip parsing as in production")
+    parser.add_argument('--output', default='profile', help="directory for the reports (default: profile)")
+    args = parser.parse_args()
+
+    page = None
+    if args.page:
+        pages = dict(recorded_pages())
+        if args.page not in pages:
+            parser.error(f"no recorded page {args.page!r} (have: {', '.join(pages) or 'none'})")
+        page = pages[args.page]
+
+    context = multiprocessing.get_context('fork')
+    urls = context.Queue()
+    server = context.Process(target=serve, args=(urls, args.rows, args.running, args.latency / 1000, page), daemon=True)
+    server.start()
+
+    import requests
+    from ucam_bot import notify, portal, storage
+    from ucam_bot.poll import init_running_courses
+    from ucam_bot.profiling import print_profile_summary, profile_polls
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = urls.get(timeout=10)
+        config.BASE_URL = url
+        config.TELEGRAM_API_URL = url
+        config.TELEGRAM_CHAT_INTERVAL_SECONDS = 0
+        config.STATE_BACKEND = args.state or f'sqlite:{os.path.join(workdir, "profile_state.db")}'
+        config.SESSION_KEY = None
+        config.UCAM_RATE_PER_SECOND = 1e6
+        config.UCAM_BURST = 1e6
+        try:
+            account = portal.UcamAccount('profile', 'secret', 'profile-chat', state_id='profile')
+            if not storage.check_store() or not portal.login_ucam(account):
+                sys.exit(1)
+            state = storage.load_bot_state(account.state_id)
+            init_running_courses(account, state)
+
+            def before_poll(i):
+                if i == args.polls // 2:
+                    requests.post(f'{url}/__standin/publish', params={'user': account.user_id}, timeout=10)
+
+            summary = profile_polls(account, state, args.polls, args.output,
+                                    full_parse=not args.unchanged, before_poll=before_poll)
+            print_profile_summary(summary, args.output)
+        finally:
+            notify.shutdown_dispatcher()
+            storage.flush_state_writes()
+            storage.close_store()
+            server.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Save an anonymised StudentCourseHistory.aspx for the benchmarks.
+
+Reads a page saved from the browser, or logs in with USER_ID and PASSWORD
+from .env and fetches it, then strips personal data (see
+fixtures.anonymise_page) and writes benchmarks/pages/NAME.html. Check the
+result before committing it.
+
+Usage:
+    python benchmarks/record_page.py NAME [saved_page.html]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import PAGES_DIR, anonymise_page
+
+def fetch_live_page():
+    from dotenv import load_dotenv
+    load_dotenv()
+    from ucam_bot import config
+    from ucam_bot.portal import UcamAccount, get_table_html, login_ucam
+
+    account = UcamAccount(os.getenv('USER_ID'), os.getenv('PASSWORD'), state_id='record')
+    if not account.user_id or not login_ucam(account):
+        print("❌ Could not log in with USER_ID and PASSWORD")
+        sys.exit(1)
+    config.FETCH_MODE = 'full'
+    return get_table_html(account)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('name', help="file name under benchmarks/pages, without .html")
+    parser.add_argument('page', nargs='?', help="saved page to anonymise (default: fetch it from UCAM)")
+    args = parser.parse_args()
+
+    if args.page:
+        with open(args.page, encoding='utf-8') as f:
+            page_html = f.read()
+    else:
+        page_html = fetch_live_page()
+
+    from ucam_bot.parser import extract_courses
+    rows = len(extract_courses(page_html))
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    path = os.path.join(PAGES_DIR, f'{args.name}.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(anonymise_page(page_html))
+    print(f"✅ Saved {path}: {rows} course rows, {len(page_html) / 1024:.1f} KB")
+
+if __name__ == '__main__':
+    main()
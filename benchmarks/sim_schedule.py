@@ -0,0 +1,122 @@
+"""Simulate the poll schedulers against a synthetic results season.
+
+Grades are released on random days at hours drawn from a fixed
+distribution (mostly afternoons and late evenings, Dhaka time), and UCAM is
+down for a few hours once. Each scheduler polls a simulated clock; a failed
+poll costs as many requests as call_with_retries() makes before giving up.
+Prints requests per detected grade and detection latency for the old fixed
+60-second loop and for PollScheduler.
+
+Usage:
+    python benchmarks/sim_schedule.py [--days N] [--seed N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucam_bot import config
+from ucam_bot.schedule import UTC_OFFSET_SECONDS, PollScheduler
+
+DAY = 24 * 3600
+# (start hour, end hour, share of releases), Dhaka time
+RELEASE_WINDOWS = [(14, 18, 0.6), (20, 23, 0.25), (9, 13, 0.12), (0, 24, 0.03)]
+RELEASE_DAY_CHANCE = 0.4
+# call_with_retries() makes this many requests before a poll counts as failed
+REQUESTS_PER_FAILED_POLL = 3
+
+def make_releases(days, rng):
+    """Return sorted (time, grades) releases, times in seconds since the simulated epoch (midnight Dhaka)."""
+    releases = []
+    for day in range(days):
+        if rng.random() >= RELEASE_DAY_CHANCE:
+            continue
+        start, end, _ = rng.choices(RELEASE_WINDOWS, weights=[w[2] for w in RELEASE_WINDOWS])[0]
+        at = day * DAY + rng.uniform(start, end) * 3600 - UTC_OFFSET_SECONDS
+        releases.append((at, rng.randint(1, 3)))
+    return sorted(releases)
+
+class FixedLoop:
+    """The old bot_v2 loop: 60 seconds after a poll, 60 seconds after an error."""
+
+    adaptive = False
+
+    def __init__(self):
+        self.failures = 0
+
+    def next_delay(self, now=None):
+        return 60
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+
+    def record_publication(self, now=None):
+        pass
+
+def simulate(scheduler, releases, outage, days):
+    """Run one scheduler over the season. Returns (requests, latencies, requests during the outage)."""
+    end = days * DAY - UTC_OFFSET_SECONDS
+    now = -UTC_OFFSET_SECONDS
+    pending = list(releases)
+    latencies = []
+    requests = 0
+    outage_requests = 0
+    while now < end:
+        if outage[0] <= now < outage[1]:
+            requests += REQUESTS_PER_FAILED_POLL
+            outage_requests += REQUESTS_PER_FAILED_POLL
+            scheduler.record_failure()
+        else:
+            requests += 1
+            scheduler.record_success()
+            found = False
+            while pending and pending[0][0] <= now:
+                released_at, grades = pending.pop(0)
+                latencies.extend([now - released_at] * grades)
+                found = True
+            if found:
+                scheduler.record_publication(now)
+        now += scheduler.next_delay(now)
+    return requests, latencies, outage_requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    releases = make_releases(args.days, rng)
+    outage_start = rng.randrange(args.days // 2) * DAY + 15 * 3600 - UTC_OFFSET_SECONDS
+    outage = (outage_start, outage_start + 3 * 3600)
+    grades = sum(n for _, n in releases)
+    print(f"{args.days} days, {len(releases)} releases, {grades} grades, one 3h outage\n")
+
+    policies = [
+        ('fixed 60s (old loop)', FixedLoop()),
+        ('fixed + backoff', PollScheduler(adaptive=False, rng=random.Random(args.seed))),
+        ('adaptive', PollScheduler(rng=random.Random(args.seed))),
+    ]
+    print(f"{'scheduler':<22} {'requests/day':>13} {'requests/grade':>15} {'median latency s':>17} "
+          f"{'p90 latency s':>14} {'outage requests':>16}")
+    for name, scheduler in policies:
+        requests, latencies, outage_requests = simulate(scheduler, releases, outage, args.days)
+        latencies.sort()
+        p90 = latencies[int(len(latencies) * 0.9)] if latencies else 0
+        print(f"{name:<22} {requests / args.days:>13.0f} {requests / max(grades, 1):>15.0f} "
+              f"{statistics.median(latencies) if latencies else 0:>17.0f} {p90:>14.0f} {outage_requests:>16}")
+
+    learned = policies[-1][1]
+    busiest = sorted(range(24), key=lambda hour: learned.interval_for(hour))[:4]
+    print(f"\nLearned busiest hours (Dhaka): {', '.join(f'{h:02d}:00 every {learned.interval_for(h):.0f}s' for h in sorted(busiest))}")
+    print(f"Quietest interval: {max(learned.interval_for(h) for h in range(24)):.0f}s, "
+          f"POLL_ACTIVE_HOURS={config.POLL_ACTIVE_HOURS}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Soak test: check memory stays flat over thousands of polls.
+
+Runs --polls poll cycles back to back, as bot_v2.py's loop does minus the
+sleeps. The UCAM stand-in runs in a separate process so its memory is not
+counted. Every poll parses and diffs the whole table (unless --unchanged).
+Results are published every --publish-every polls, and sessions expired every
+--expire-every polls, so the notify, state-write and re-login paths run too.
+
+After --warmup polls, RSS and tracemalloc's traced memory are sampled every
+--sample-every polls, after a gc.collect(). RSS is counted less
+tracemalloc's own overhead. The run fails if:
+
+    budget     peak RSS goes over --budget-mb (default 45; a 3000-poll run
+               peaks at about 40 MB, the figure in the README)
+    working    peak RSS above the baseline taken after imports and warming the
+               parser and store goes over --working-mb (default 4; measured
+               about 1.5 MB), which catches regressions the absolute figure hides
+    growth     traced memory after the last poll exceeds that after warmup by more
+               than --max-growth-kb, or grows across the second half of the run
+               too; the sites that grew are printed
+
+Usage:
+    python benchmarks/soak_test.py [--polls 3000] [--rows 120] [--parser lxml|bs4] [--budget-mb 45]
+                                   [--working-mb 4] [--max-growth-kb 256] [--output soak.json]
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ucam_bot import config
+from fixtures import course_history_page
+
+def rss_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is missing)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def serve(url_queue, rows, running):
+    """Run the stand-in until the process is killed."""
+    from ucam_standin import StandIn
+    standin = StandIn(rows=rows, running=running).start()
+    url_queue.put(standin.url)
+    threading.Event().wait()
+
+def sample(poll, started):
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0]
+    overhead = tracemalloc.get_tracemalloc_memory()
+    return {
+        'poll': poll,
+        'seconds': time.perf_counter() - started,
+        'rss_mb': rss_mb(),
+        'tracemalloc_overhead_mb': overhead / 1024 / 1024,
+        'traced_kb': traced / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=int, default=3000)
+    parser.add_argument('--warmup', type=int, default=200, help="polls before the first measurement")
+    parser.add_argument('--sample-every', type=int, default=100)
+    parser.add_argument('--rows', type=int, default=120, help="course rows on the stand-in's page")
+    parser.add_argument('--running', type=int, default=40, help="courses without a grade (publications available)")
+    parser.add_argument('--publish-every', type=int, default=100, help="publish one result every N polls (0: never)")
+    parser.add_argument('--expire-every', type=int, default=250, help="expire the session every N polls (0: never)")
+    parser.add_argument('--parser', choices=['lxml', 'bs4'], default=config.PARSER_BACKEND)
+    parser.add_argument('--unchanged', action='store_true', help="keep the fingerprint check, as production polls do")
+    parser.add_argument('--budget-mb', type=float, default=45,
+                        help="most RSS the bot may use in total (default: 45)")
+    parser.add_argument('--working-mb', type=float, default=4,
+                        help="most RSS the bot may use above its post-import baseline (default: 4)")
+    parser.add_argument('--max-growth-kb', type=float, default=256,
+                        help="most traced memory that may be retained between warmup and the last poll (default: 256)")
+    parser.add_argument('--frames', type=int, default=1, help="tracemalloc frames per allocation")
+    parser.add_argument('--output', help="write the samples and verdict here (JSON)")
+    args = parser.parse_args()
+    if args.polls <= args.warmup:
+        parser.error("--polls must be larger than --warmup")
+
+    context = multiprocessing.get_context('fork')
+    urls = context.Queue()
+    server = context.Process(target=serve, args=(urls, args.rows, args.running), daemon=True)
+    server.start()
+
+    import requests
+    from ucam_bot import notify, portal, storage
+    from ucam_bot.parser import extract_courses
+    from ucam_bot.poll import init_running_courses, poll_account, remember_publication
+    from ucam_bot.schedule import PollScheduler
+
+    with tempfile.TemporaryDirectory() as workdir:
+        url = urls.get(timeout=10)
+        config.BASE_URL = url
+        config.TELEGRAM_API_URL = url
+        config.TELEGRAM_CHAT_INTERVAL_SECONDS = 0
+        config.PARSER_BACKEND = args.parser
+        config.STATE_BACKEND = f'sqlite:{os.path.join(workdir, "soak_state.db")}'
+        config.SESSION_KEY = None
+        config.UCAM_RATE_PER_SECOND = 1e6
+        config.UCAM_BURST = 1e6
+
+        # Load the lazily imported parser and store before taking the baseline
+        extract_courses(course_history_page(args.rows))
+        if not storage.check_store():
+            sys.exit(1)
+        gc.collect()
+        baseline_mb = rss_mb()
+
+        account = portal.UcamAccount('soak', 'secret', 'soak-chat', state_id='soak')
+        samples = []
+        failures = []
+        try:
+            if not portal.login_ucam(account):
+                sys.exit(1)
+            state = storage.load_bot_state(account.state_id)
+            init_running_courses(account, state)
+            scheduler = PollScheduler(state['publication_hours'], adaptive=True)
+            control = requests.Session()
+
+            tracemalloc.start(args.frames)
+            started = time.perf_counter()
+            warm = None
+            midpoint = None
+            for poll in range(1, args.polls + 1):
+                if args.publish_every and poll % args.publish_every == 0:
+                    control.post(f'{url}/__standin/publish', params={'user': account.user_id}, timeout=10)
+                if args.expire_every and poll % args.expire_every == 0:
+                    control.post(f'{url}/__standin/expire', params={'user': account.user_id}, timeout=10)
+                if not args.unchanged:
+                    state['table_fingerprint'] = None
+                found = poll_account(account, state)
+                scheduler.record_success()
+                if found:
+                    remember_publication(account, state, scheduler)
+
+                if poll >= args.warmup and (poll - args.warmup) % args.sample_every == 0 or poll == args.polls:
+                    notify.get_dispatcher().flush(30)
+                    storage.flush_state_writes()
+                    samples.append(sample(poll, started))
+                    current = samples[-1]
+                    print(f"  poll {poll:>6}: RSS {current['rss_mb']:.1f} MB "
+                          f"(+{current['rss_mb'] - current['tracemalloc_overhead_mb'] - baseline_mb:.1f} MB over baseline), "
+                          f"traced {current['traced_kb']:.0f} KB, {current['seconds'] / poll * 1000:.1f} ms/poll")
+                    if warm is None:
+                        warm = tracemalloc.take_snapshot()
+                    if midpoint is None and poll >= (args.warmup + args.polls) / 2:
+                        midpoint = samples[-1]
+            final = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        finally:
+            notify.shutdown_dispatcher()
+            storage.flush_state_writes()
+            storage.close_store()
+            server.terminate()
+
+    first, last = samples[0], samples[-1]
+    peak_mb = max(s['rss_mb'] - s['tracemalloc_overhead_mb'] for s in samples)
+    peak_over = peak_mb - baseline_mb
+    growth_kb = last['traced_kb'] - first['traced_kb']
+    late_growth_kb = last['traced_kb'] - midpoint['traced_kb']
+    print(f"\n{args.polls} polls in {last['seconds']:.0f}s, {account.stats['logins']} logins, "
+          f"{account.stats['notifications']} notifications, parser {args.parser}")
+    print(f"Peak RSS {peak_mb:.1f} MB (budget {args.budget_mb:.0f} MB): {baseline_mb:.1f} MB after imports, "
+          f"up to {peak_over:.1f} MB more while polling (budget {args.working_mb:.0f} MB)")
+    print(f"Traced memory retained since poll {first['poll']}: {growth_kb:+.1f} KB "
+          f"({late_growth_kb:+.1f} KB in the second half; allowed {args.max_growth_kb:.0f} KB)")
+
+    if peak_mb > args.budget_mb:
+        failures.append(f"memory over budget: {peak_mb:.1f} MB > {args.budget_mb:.0f} MB")
+    if peak_over > args.working_mb:
+        failures.append(f"working memory over budget: {peak_over:.1f} MB > {args.working_mb:.0f} MB "
+                        f"above the post-import baseline")
+    if growth_kb > args.max_growth_kb or late_growth_kb > args.max_growth_kb / 2:
+        failures.append(f"retained memory grew by {growth_kb:.1f} KB")
+        print("Largest growth since warmup:")
+        for stat in final.compare_to(warm, 'lineno')[:10]:
+            print(f"  {stat}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'settings': vars(args),
+                'baseline_mb': baseline_mb,
+                'peak_mb': peak_mb,
+                'peak_over_baseline_mb': peak_over,
+                'retained_growth_kb': growth_kb,
+                'samples': samples,
+                'failures': failures,
+            }, f, indent=2)
+        print(f"Samples written to {args.output}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Memory within {args.budget_mb:.0f} MB ({args.working_mb:.0f} MB while polling) "
+          f"and flat over {args.polls} polls")
+
+if __name__ == '__main__':
+    main()
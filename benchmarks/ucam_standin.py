@@ -0,0 +1,432 @@
+"""A local stand-in for the UCAM portal, for load and integration tests.
+
+Serves the endpoints the bot uses, imitating ASP.NET:
+
+    GET  /Security/Login.aspx                 login form with __VIEWSTATE and __EVENTVALIDATION
+    POST /Security/Login.aspx                 302 to the dashboard on success, the form again on failure
+    GET  /Student/Dashboard.aspx              menu with mmi links
+    GET  /Student/StudentCourseHistory.aspx   the gvRegisteredCourse table, or 302 to login if the session expired
+    POST /bot<token>/sendMessage              accepts Telegram messages (set TELEGRAM_API_URL to this server)
+
+Every student gets a synthetic course history (see fixtures.py) whose last
+`running` courses have no grade, unless `page` gives a recorded course
+history page to serve to everyone instead (publishing does not change it).
+Grades are published on a script, every `publish_every` seconds, or on
+request. Sessions expire after `session_ttl` idle seconds. Latency, 503 errors, hung requests and outages can be injected.
+
+A few control endpoints help tests running in other processes:
+
+    GET  /__standin/stats                     counters as JSON
+    POST /__standin/publish?user=ID&count=N   publish the next N running courses (all students without user)
+    POST /__standin/expire?user=ID            end sessions (all without user)
+    POST /__standin/config?latency=0.2&error_rate=0.05
+
+Usage:
+    python benchmarks/ucam_standin.py [--port 8080] [--rows 40] [--latency MS] [--error-rate P] ...
+    UCAM_BASE_URL=http://127.0.0.1:8080 TELEGRAM_API_URL=http://127.0.0.1:8080 python bot_v2.py --once
+
+From Python:
+    standin = StandIn(rows=120, latency=0.05).start()
+    config.BASE_URL = standin.url
+    standin.publish('0112345678')
+    standin.stop()
+"""
+import argparse
+import http.server
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs, quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import GRADES, dashboard_page, login_page, make_courses, make_page
+
+VIEWSTATE_FIELD = '__VIEWSTATE'
+EVENTVALIDATION_FIELD = '__EVENTVALIDATION'
+USERNAME_FIELD = 'ctl00$logMain$UserName'
+PASSWORD_FIELD = 'ctl00$logMain$Password'
+SESSION_COOKIE = '.ASPXAUTH'
+COURSE_HISTORY_PATH = '/student/studentcoursehistory.aspx'
+
+class Student:
+    """One account on the stand-in: password, course rows and the rendered page."""
+
+    def __init__(self, user_id, password, rows, running, seed):
+        self.user_id = user_id
+        self.password = password
+        self.courses = make_courses(rows, running=running, seed=seed)
+        self.mmi = secrets.token_hex(5)
+        self._page = None
+
+    def running(self):
+        return [course for course in self.courses if not course['Grade']]
+
+    def page(self):
+        """The course history page as bytes, rendered again only after a change."""
+        if self._page is None:
+            self._page = make_page(self.courses).encode('utf-8')
+        return self._page
+
+    def publish(self, count, rng, grade=None):
+        """Give the first `count` running courses a grade. Returns the courses published."""
+        published = []
+        for course in self.running()[:count]:
+            course['Grade'], course['Point'] = next((g for g in GRADES if g[0] == grade), None) or rng.choice(GRADES)
+            course['Course Status'] = 'Completed'
+            published.append(course)
+        if published:
+            self._page = None
+        return published
+
+class StandIn:
+    """The stand-in portal. Options can be changed while it runs."""
+
+    def __init__(self, rows=40, running=4, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0,
+                 hang_seconds=15.0, outages=(), session_ttl=1200.0, script=(), publish_every=None,
+                 mmi_in_redirect=False, accept_any=True, seed=0, page=None):
+        self.rows = rows
+        self.running = running
+        # Seconds added to every response, plus up to `jitter` more
+        self.latency = latency
+        self.jitter = jitter
+        # Share of requests answered with 503, and of requests that hang for hang_seconds first
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        # (start, end) seconds after start() during which every request gets a 503
+        self.outages = list(outages)
+        self.session_ttl = session_ttl
+        # [{"at": seconds, "user": id (all students if missing), "count": 1, "grade": "A"}]
+        self.script = sorted(script, key=lambda event: event['at'])
+        self.publish_every = publish_every
+        self.mmi_in_redirect = mmi_in_redirect
+        # Unknown user ids are registered on their first login with whatever password they use
+        self.accept_any = accept_any
+        self.page = page.encode('utf-8') if isinstance(page, str) else page
+        self.rng = random.Random(seed)
+        self.students = {}
+        self.sessions = {}
+        self.stats = Counter()
+        self.messages = []
+        self.started = time.monotonic()
+        self._next_publication = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._login_page = login_page().encode('utf-8')
+        self._viewstate, self._eventvalidation = self._form_tokens()
+
+    def _form_tokens(self):
+        """The __VIEWSTATE and __EVENTVALIDATION values a login POST must send back."""
+        return tuple(
+            re.search(rf'name="{name}" id="{name}" value="([^"]*)"'.encode(), self._login_page).group(1).decode()
+            for name in (VIEWSTATE_FIELD, EVENTVALIDATION_FIELD)
+        )
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve on a background thread. Returns self."""
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self.started = time.monotonic()
+        if self.publish_every:
+            self._next_publication = self.publish_every
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def add_student(self, user_id, password, rows=None, running=None):
+        with self._lock:
+            return self._add_student(user_id, password, rows, running)
+
+    def _add_student(self, user_id, password, rows=None, running=None):
+        student = Student(user_id, password, rows or self.rows, self.running if running is None else running,
+                          seed=len(self.students))
+        self.students[user_id] = student
+        return student
+
+    def publish(self, user_id=None, count=1, grade=None):
+        """Publish the next `count` running courses of one student, or of every student. Returns how many."""
+        with self._lock:
+            return self._publish(user_id, count, grade)
+
+    def _publish(self, user_id, count, grade=None):
+        students = [self.students[user_id]] if user_id in self.students else \
+            list(self.students.values()) if user_id is None else []
+        published = sum(len(student.publish(count, self.rng, grade)) for student in students)
+        self.stats['publications'] += published
+        return published
+
+    def expire_sessions(self, user_id=None):
+        """End the sessions of one student, or everyone's. Returns how many ended."""
+        with self._lock:
+            ended = [token for token, session in self.sessions.items() if user_id in (None, session['user_id'])]
+            for token in ended:
+                del self.sessions[token]
+            self.stats['sessions_ended'] += len(ended)
+            return len(ended)
+
+    def snapshot(self):
+        """Counters and a few gauges as a dict."""
+        with self._lock:
+            return dict(self.stats, students=len(self.students), sessions=len(self.sessions),
+                        running_courses=sum(len(s.running()) for s in self.students.values()),
+                        uptime_seconds=time.monotonic() - self.started)
+
+    def _run_script(self, now):
+        """Apply scripted and periodic publications that are due. Called with the lock held."""
+        elapsed = now - self.started
+        while self.script and self.script[0]['at'] <= elapsed:
+            event = self.script.pop(0)
+            self._publish(event.get('user'), event.get('count', 1), event.get('grade'))
+        while self._next_publication is not None and self._next_publication <= elapsed:
+            self._publish(None, 1)
+            self._next_publication += self.publish_every
+
+    def fault(self, now):
+        """Decide what goes wrong with this request: None, 'error' or 'hang'."""
+        elapsed = now - self.started
+        if any(start <= elapsed < end for start, end in self.outages):
+            return 'error'
+        roll = self.rng.random()
+        if roll < self.timeout_rate:
+            return 'hang'
+        if roll < self.timeout_rate + self.error_rate:
+            return 'error'
+        return None
+
+    def session_for(self, cookies, now):
+        """Return the live session for the request's cookies, renewing its idle timer, or None."""
+        session = self.sessions.get(cookies.get(SESSION_COOKIE))
+        if session is None:
+            return None
+        if now - session['last_seen'] > self.session_ttl:
+            del self.sessions[cookies[SESSION_COOKIE]]
+            self.stats['sessions_expired'] += 1
+            return None
+        session['last_seen'] = now
+        return session
+
+    def log_in(self, form):
+        """Check a login POST. Returns (status, body or Location, session token or None)."""
+        if form.get(VIEWSTATE_FIELD) != self._viewstate or form.get(EVENTVALIDATION_FIELD) != self._eventvalidation:
+            self.stats['invalid_viewstate'] += 1
+            return 500, b'<html><body>Validation of viewstate MAC failed.</body></html>', None
+        user_id = form.get(USERNAME_FIELD, '')
+        password = form.get(PASSWORD_FIELD, '')
+        student = self.students.get(user_id)
+        if student is None and self.accept_any and user_id:
+            student = self._add_student(user_id, password)
+        if student is None or student.password != password:
+            self.stats['failed_logins'] += 1
+            page = self._login_page.replace(b'<h3>Sign in to UCAM</h3>',
+                                            b'<h3>Sign in to UCAM</h3><span class="error">Invalid user id or password</span>')
+            return 200, page, None
+        token = secrets.token_hex(16)
+        now = time.monotonic()
+        self.sessions[token] = {'user_id': student.user_id, 'created': now, 'last_seen': now}
+        self.stats['logins'] += 1
+        location = '/Student/Dashboard.aspx' + (f'?mmi={student.mmi}' if self.mmi_in_redirect else '')
+        return 302, location, token
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def standin(self):
+        return self.server.standin
+
+    def cookies(self):
+        cookies = {}
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name:
+                cookies[name] = value
+        return cookies
+
+    def reply(self, status, body=b'', headers=(), content_type='text/html; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.standin._lock:
+            self.standin.stats['bytes_sent'] += len(body)
+            self.standin.stats[f'status_{status}'] += 1
+
+    def redirect(self, location, headers=()):
+        self.reply(302, b'', [('Location', location)] + list(headers))
+
+    def read_form(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8', 'replace')
+        return {name: values[0] for name, values in parse_qs(body, keep_blank_values=True).items()}
+
+    def handle_request(self, method):
+        standin = self.standin
+        url = urlsplit(self.path)
+        path = url.path.lower()
+        if path.startswith('/__standin/'):
+            return self.control(method, path, parse_qs(url.query))
+        if path.startswith('/bot') and path.endswith('/sendmessage'):
+            return self.telegram()
+
+        now = time.monotonic()
+        with standin._lock:
+            standin.stats['requests'] += 1
+            standin._run_script(now)
+            fault = standin.fault(now)
+            if fault:
+                standin.stats['hung' if fault == 'hang' else 'errors_injected'] += 1
+            delay = standin.latency + standin.rng.uniform(0, standin.jitter)
+        if fault == 'hang':
+            delay += standin.hang_seconds
+        if delay:
+            time.sleep(delay)
+        if fault:
+            if method == 'POST':
+                self.read_form()
+            return self.reply(503, b'<html><body>Service Unavailable</body></html>')
+
+        if path == '/security/login.aspx':
+            if method == 'GET':
+                return self.reply(200, standin._login_page,
+                                  [('Set-Cookie', f'ASP.NET_SessionId={secrets.token_hex(12)}; path=/; HttpOnly')])
+            form = self.read_form()
+            with standin._lock:
+                status, result, token = standin.log_in(form)
+            if status == 302:
+                return self.redirect(result, [('Set-Cookie', f'{SESSION_COOKIE}={token}; path=/; HttpOnly')])
+            return self.reply(status, result)
+
+        with standin._lock:
+            session = standin.session_for(self.cookies(), now)
+            student = standin.students.get(session['user_id']) if session else None
+        if path == '/student/dashboard.aspx':
+            if student is None:
+                return self.redirect('/Security/Login.aspx')
+            return self.reply(200, dashboard_page(student.mmi).encode('utf-8'))
+        if path == COURSE_HISTORY_PATH:
+            if student is None:
+                return self.redirect(f'/Security/Login.aspx?ReturnUrl={quote(url.path, safe="")}')
+            with standin._lock:
+                standin.stats['course_pages'] += 1
+                page = self.standin.page or student.page()
+            return self.reply(200, page)
+        self.reply(404, b'<html><body>The resource cannot be found.</body></html>')
+
+    def telegram(self):
+        form = self.read_form()
+        with self.standin._lock:
+            self.standin.stats['telegram_messages'] += 1
+            self.standin.messages.append((form.get('chat_id'), form.get('text', '')))
+            del self.standin.messages[:-1000]
+        body = json.dumps({'ok': True, 'result': {'message_id': self.standin.stats['telegram_messages']}})
+        self.reply(200, body.encode('utf-8'), content_type='application/json')
+
+    def control(self, method, path, query):
+        standin = self.standin
+        user = query.get('user', [None])[0]
+        if path == '/__standin/stats':
+            result = standin.snapshot()
+        elif path == '/__standin/publish' and method == 'POST':
+            result = {'published': standin.publish(user, int(query.get('count', ['1'])[0]), query.get('grade', [None])[0])}
+        elif path == '/__standin/expire' and method == 'POST':
+            result = {'ended': standin.expire_sessions(user)}
+        elif path == '/__standin/config' and method == 'POST':
+            for name in ('latency', 'jitter', 'error_rate', 'timeout_rate', 'hang_seconds', 'session_ttl'):
+                if name in query:
+                    setattr(standin, name, float(query[name][0]))
+            result = {'ok': True}
+        else:
+            return self.reply(404, b'{}', content_type='application/json')
+        self.reply(200, json.dumps(result).encode('utf-8'), content_type='application/json')
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+def parse_outage(spec):
+    """'120+60' -> (120, 180): an outage starting 120 s after start, lasting 60 s."""
+    start, _, duration = spec.partition('+')
+    return float(start), float(start) + float(duration)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--rows', type=int, default=40, help="course rows per student")
+    parser.add_argument('--running', type=int, default=4, help="courses without a grade per student")
+    parser.add_argument('--accounts', help="accounts.json whose students are registered up front")
+    parser.add_argument('--latency', type=float, default=0, help="ms added to every response")
+    parser.add_argument('--jitter', type=float, default=0, help="up to this many more ms, at random")
+    parser.add_argument('--error-rate', type=float, default=0, help="share of requests answered with 503")
+    parser.add_argument('--timeout-rate', type=float, default=0, help="share of requests that hang for --hang-seconds")
+    parser.add_argument('--hang-seconds', type=float, default=15)
+    parser.add_argument('--outage', action='append', default=[], metavar='START+SECONDS',
+                        help="answer everything with 503 from START for SECONDS (repeatable)")
+    parser.add_argument('--session-ttl', type=float, default=1200, help="idle seconds before a session expires")
+    parser.add_argument('--script', help="JSON file of publications: [{\"at\": 60, \"user\": \"...\", \"count\": 1}]")
+    parser.add_argument('--publish-every', type=float, help="publish one course for every student this often (s)")
+    parser.add_argument('--mmi-in-redirect', action='store_true', help="put the mmi in the post-login redirect")
+    parser.add_argument('--strict', action='store_true', help="only accept students from --accounts")
+    parser.add_argument('--page', help="serve this saved course history page (e.g. benchmarks/pages/NAME.html) to everyone")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    page = None
+    if args.page:
+        with open(args.page, encoding='utf-8') as f:
+            page = f.read()
+    script = []
+    if args.script:
+        with open(args.script, encoding='utf-8') as f:
+            script = json.load(f)
+    standin = StandIn(
+        rows=args.rows, running=args.running, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+        outages=[parse_outage(spec) for spec in args.outage], session_ttl=args.session_ttl, script=script,
+        publish_every=args.publish_every, mmi_in_redirect=args.mmi_in_redirect, accept_any=not args.strict,
+        seed=args.seed, page=page,
+    )
+    if args.accounts:
+        with open(args.accounts, encoding='utf-8') as f:
+            for account in json.load(f):
+                standin.add_student(account['user_id'], account['password'])
+    standin.start(args.host, args.port)
+    print(f"UCAM stand-in on {standin.url}")
+    print(f"  UCAM_BASE_URL={standin.url} TELEGRAM_API_URL={standin.url} python bot_v2.py --once")
+    try:
+        while True:
+            time.sleep(60)
+            stats = standin.snapshot()
+            print(f"{stats.get('requests', 0)} requests, {stats.get('logins', 0)} logins, "
+                  f"{stats.get('publications', 0)} publications, {stats.get('telegram_messages', 0)} messages, "
+                  f"{stats.get('errors_injected', 0)} errors injected")
+    except KeyboardInterrupt:
+        standin.stop()
+
+if __name__ == '__main__':
+    main()
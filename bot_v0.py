@@ -12,6 +12,7 @@ import json
 import os
 import requests
 from dotenv import load_dotenv
+from ucam_bot.retry import with_retries
 
 # Load environment variables from .env file
 load_dotenv()
@@ -90,16 +91,6 @@ def get_telegram_updates():
     except Exception as e:
         pass
 
-def with_retries(task_fn, max_retries=3, delay=2, *args, **kwargs):
-    """Generic retry helper for any task."""
-    for attempt in range(1, max_retries + 1):
-        try:
-            return task_fn(*args, **kwargs)
-        except Exception as e:
-            if attempt == max_retries:
-                raise
-            time.sleep(delay)
-
 # --- Main Execution ---
 USER_ID = os.getenv('USER_ID')
 PASSWORD = os.getenv('PASSWORD')
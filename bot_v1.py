@@ -12,6 +12,7 @@ import json
 import os
 import requests
 from dotenv import load_dotenv
+from ucam_bot.retry import with_retries
 from datetime import datetime, timedelta
 from pymongo import MongoClient
 from pymongo.errors import ServerSelectionTimeoutError
@@ -99,17 +100,6 @@ def login_ucam(driver, user_id, password, wait, max_retries=3):
                 return False
             time.sleep(2)
 
-def with_retries(task_fn, max_retries=3, delay=2, *args, **kwargs):
-    """Generic retry helper for any task."""
-    for attempt in range(1, max_retries + 1):
-        try:
-            return task_fn(*args, **kwargs)
-        except Exception as e:
-            print(f"Attempt {attempt} failed: {e}")
-            if attempt == max_retries:
-                raise
-            time.sleep(delay)
-
 def click_xpath(xpath):
     elem = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
     elem.click()
@@ -0,0 +1,14 @@
+"""Watch many UCAM accounts from one process. See ucam_bot/multi_account.py.
+
+Usage:
+    python multi_account.py [accounts.json]
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from ucam_bot.multi_account import main
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,11 @@ echo %date% %time% - Setting up running courses >> logs\setup.log
 REM Activate virtual environment
 call venv\Scripts\activate
 
+REM bot_v0.py (run_bot.bat) reads running_courses.json; keep the bot's own state in a local file
+set STATE_BACKEND=sqlite:bot_state.db
+
 REM Run the setup script
-python setup_running_courses.py >> logs\setup.log 2>&1
+python setup_running_courses.py --json running_courses.json >> logs\setup.log 2>&1
 
 REM Log the completion
 echo %date% %time% - Setup completed with exit code %errorlevel% >> logs\setup.log
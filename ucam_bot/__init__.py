@@ -0,0 +1,10 @@
+"""UCAM Results Notifier: watch the UIU UCAM portal and announce new grades on Telegram.
+
+Importing the package has no side effects. Nothing connects to UCAM, MongoDB
+or Telegram until ucam_bot.cli.main() (or another entry point) runs, and
+heavy dependencies are imported on first use.
+"""
+import time
+
+# Start of the package import, for the cold-start report
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,8 @@
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from ucam_bot.cli import main
+
+main()
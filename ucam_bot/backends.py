@@ -0,0 +1,248 @@
+"""Places to keep bot state and saved sessions.
+
+Every backend stores the same three collections of documents (`bot_state`,
+`courses` and `sessions`) keyed by _id, and accepts the small subset of
+MongoDB update syntax that storage.py sends: {'$set': {...}},
+{'$unset': {...}}, or None to delete the document.
+
+    mongo                     MongoDB Atlas (MONGO_URI)
+    sqlite:bot_state.db       SQLite database in WAL mode
+    json:bot_state.json       JSON file replaced atomically on every write
+
+The JSON backend also reads the running_courses.json file written by
+bot_v0.py and setup_running_courses.py (a plain list of course rows), so
+it can be migrated, but refuses to write over it: bot_v0.py still reads
+that file as a list.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+COLLECTIONS = ('bot_state', 'courses', 'sessions')
+
+def _apply_update(doc, update):
+    """Return `doc` with a {'$set': ..., '$unset': ...} update applied."""
+    doc = dict(doc)
+    doc.update(update.get('$set', {}))
+    for field in update.get('$unset', {}):
+        doc.pop(field, None)
+    return doc
+
+def _project(doc, fields):
+    if fields is None:
+        return doc
+    return {field: doc[field] for field in ('_id',) + tuple(fields) if field in doc}
+
+def _connect_mongo(mongo_uri):
+    # pymongo takes a noticeable share of startup, so it is imported off the main thread
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        client.admin.command('ping')  # Test connection
+        client['ucam_bot']['courses'].create_index('state_id')
+    except Exception:
+        client.close()
+        raise
+    return client
+
+class MongoBackend:
+    """The `ucam_bot` database on MongoDB. Connects on a background thread."""
+
+    name = 'MongoDB Atlas'
+
+    def __init__(self, mongo_uri):
+        if not mongo_uri:
+            raise ValueError("MONGO_URI not found in environment variables. Add it to .env")
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.connection = self._executor.submit(_connect_mongo, mongo_uri)
+
+    def check(self):
+        """Wait for the connection and report the outcome. Returns False on failure."""
+        try:
+            self.connection.result()
+            print("✅ Connected to MongoDB Atlas successfully.")
+            return True
+        except Exception as e:
+            from pymongo.errors import ServerSelectionTimeoutError
+            if isinstance(e, ServerSelectionTimeoutError):
+                print("❌ ERROR: Failed to connect to MongoDB Atlas. Check MONGO_URI.")
+                print(f"   Details: {e}")
+            else:
+                print(f"❌ ERROR: MongoDB connection error: {e}")
+        return False
+
+    def close(self):
+        if self.connection.done() and self.connection.exception() is None:
+            self.connection.result().close()
+        self._executor.shutdown(wait=False)
+
+    def db(self):
+        return self.connection.result()['ucam_bot']
+
+    def get(self, collection, doc_id, fields=None):
+        projection = None if fields is None else {field: 1 for field in fields}
+        return self.db()[collection].find_one({'_id': doc_id}, projection)
+
+    def find(self, collection, state_id=None, fields=None):
+        query = {} if state_id is None else {'state_id': state_id}
+        projection = None if fields is None else {field: 1 for field in fields}
+        return list(self.db()[collection].find(query, projection))
+
+    def write(self, ops):
+        """Send {(collection, _id): update or None} as one unordered bulk write per collection."""
+        from pymongo import DeleteOne, UpdateOne
+        by_collection = {}
+        for (collection, doc_id), update in ops.items():
+            if update is None:
+                by_collection.setdefault(collection, []).append(DeleteOne({'_id': doc_id}))
+            else:
+                by_collection.setdefault(collection, []).append(UpdateOne({'_id': doc_id}, update, upsert=True))
+        db = self.db()
+        for collection, writes in by_collection.items():
+            db[collection].bulk_write(writes, ordered=False)
+
+class SqliteBackend:
+    """Documents stored as JSON in one SQLite table, with the journal in WAL mode."""
+
+    name = 'SQLite'
+
+    def __init__(self, path):
+        import sqlite3
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL keeps the database consistent without an fsync on every commit
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' collection TEXT NOT NULL, id TEXT NOT NULL, state_id TEXT, doc TEXT NOT NULL,'
+            ' PRIMARY KEY (collection, id))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS documents_state ON documents (collection, state_id)')
+
+    def check(self):
+        print(f"✅ Using SQLite state database {self.path}.")
+        return True
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, collection, doc_id, fields=None):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT doc FROM documents WHERE collection = ? AND id = ?', (collection, doc_id)
+            ).fetchone()
+        return None if row is None else _project(json.loads(row[0]), fields)
+
+    def find(self, collection, state_id=None, fields=None):
+        with self._lock:
+            if state_id is None:
+                rows = self._conn.execute('SELECT doc FROM documents WHERE collection = ?', (collection,)).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT doc FROM documents WHERE collection = ? AND state_id = ?', (collection, state_id)
+                ).fetchall()
+        return [_project(json.loads(row[0]), fields) for row in rows]
+
+    def write(self, ops):
+        """Apply {(collection, _id): update or None} in one transaction."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for (collection, doc_id), update in ops.items():
+                    if update is None:
+                        self._conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection, doc_id))
+                        continue
+                    row = self._conn.execute(
+                        'SELECT doc FROM documents WHERE collection = ? AND id = ?', (collection, doc_id)
+                    ).fetchone()
+                    doc = _apply_update(json.loads(row[0]) if row else {'_id': doc_id}, update)
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO documents (collection, id, state_id, doc) VALUES (?, ?, ?, ?)',
+                        (collection, doc_id, doc.get('state_id'), json.dumps(doc, ensure_ascii=False))
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+class JsonFileBackend:
+    """All documents in one JSON file, written to a temporary file and renamed over the old one."""
+
+    name = 'JSON file'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {collection: {} for collection in COLLECTIONS}
+        # True for a bot_v0.py course list, which is only read
+        self.legacy_list = False
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                # running_courses.json from bot_v0.py: the running courses of the single-account bot
+                self.legacy_list = True
+                data = {'bot_state': {'state': {'_id': 'state', 'running_courses': data}}}
+            for collection in COLLECTIONS:
+                self._data[collection].update(data.get(collection, {}))
+
+    def check(self):
+        if self.legacy_list:
+            print(f"✅ Using JSON state file {self.path} (a bot_v0.py course list, read only).")
+        else:
+            print(f"✅ Using JSON state file {self.path}.")
+        return True
+
+    def close(self):
+        pass
+
+    def get(self, collection, doc_id, fields=None):
+        with self._lock:
+            doc = self._data[collection].get(doc_id)
+        return None if doc is None else _project(doc, fields)
+
+    def find(self, collection, state_id=None, fields=None):
+        with self._lock:
+            docs = [doc for doc in self._data[collection].values() if state_id is None or doc.get('state_id') == state_id]
+        return [_project(doc, fields) for doc in docs]
+
+    def write(self, ops):
+        """Apply {(collection, _id): update or None} and replace the file."""
+        if self.legacy_list:
+            raise ValueError(
+                f"{self.path} is a course list from bot_v0.py and would be overwritten. Use another "
+                f"file, e.g. python -m ucam_bot.migrate json:{self.path} json:{DEFAULT_PATHS['json']}"
+            )
+        with self._lock:
+            for (collection, doc_id), update in ops.items():
+                documents = self._data[collection]
+                if update is None:
+                    documents.pop(doc_id, None)
+                else:
+                    documents[doc_id] = _apply_update(documents.get(doc_id, {'_id': doc_id}), update)
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+DEFAULT_PATHS = {'sqlite': 'bot_state.db', 'json': 'bot_state.json'}
+
+def open_backend(spec, mongo_uri=None):
+    """Open a backend from a spec such as 'mongo', 'sqlite:bot_state.db' or 'json:bot_state.json'.
+
+    A 'mongo:' spec may carry the connection string; otherwise `mongo_uri` is used.
+    """
+    kind, _, target = spec.partition(':')
+    if kind == 'mongo':
+        return MongoBackend(target or mongo_uri)
+    if kind == 'sqlite':
+        return SqliteBackend(target or DEFAULT_PATHS['sqlite'])
+    if kind == 'json':
+        return JsonFileBackend(target or DEFAULT_PATHS['json'])
+    raise ValueError(f"Unknown STATE_BACKEND '{spec}'. Use mongo, sqlite[:path] or json[:path].")
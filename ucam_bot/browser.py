@@ -0,0 +1,267 @@
+"""Selenium fallback engine for logging in and fetching the course page.
+
+With FETCH_ENGINE=selenium, login_once() and fetch_course_page() in
+portal.py hand over to log_in_browser() and fetch_course_page_browser()
+here; retries, re-login and parsing stay the same as for HTTP. Meant for
+when the HTTP login stops working, for example after a portal redesign.
+
+One headless Chrome is started on first use and shared by every poll and
+every account in the process. Each account's cookies live in its requests
+session as usual and are swapped into the browser when that account's turn
+comes, so saved sessions work for both engines. Images, stylesheets, fonts
+and (unless BROWSER_BLOCK_SCRIPTS=0) scripts are blocked through the Chrome
+DevTools Protocol, and the course history URL is opened directly with the
+mmi instead of clicking through the menu. Page loads share the politeness
+limiter with HTTP requests.
+
+Needs the optional selenium and webdriver-manager packages and a local
+Chrome; they are imported on first use.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import requests
+
+from . import config
+from .limiter import host_limiter
+from .login import BUTTON_FIELD, PASSWORD_FIELD, USERNAME_FIELD, find_mmi, is_login_page, login_url
+from .retry import AuthError
+
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp', '*.bmp',
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.pdf',
+    '*google-analytics.com*', '*googletagmanager.com*', '*fonts.googleapis.com*',
+]
+BLOCKED_SCRIPTS = ['*.js', '*.axd*']
+
+_driver = None
+# Account whose cookies are currently in the browser
+_current_account = None
+# Serialises use of the one browser between polls and accounts
+_lock = threading.RLock()
+# Page loads, load time, bytes transferred and memory samples
+browser_stats = Counter()
+
+def start_chrome():
+    """Start headless Chrome that only downloads documents."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    options = Options()
+    options.add_argument('--headless=new')
+    options.add_argument('--window-size=1280,800')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-notifications')
+    options.add_argument('--disable-background-networking')
+    options.add_argument('--disable-component-update')
+    options.add_argument('--disable-default-apps')
+    options.add_argument('--disable-sync')
+    options.add_argument('--mute-audio')
+    options.add_argument('--no-first-run')
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_argument(f'--user-agent={config.USER_AGENT}')
+    options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    # The page is usable once the document is parsed; nothing else is downloaded anyway
+    options.page_load_strategy = 'eager'
+
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver.set_page_load_timeout(config.BROWSER_PAGE_TIMEOUT_SECONDS)
+    blocked = BLOCKED_URLS + (BLOCKED_SCRIPTS if config.BROWSER_BLOCK_SCRIPTS else [])
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+    return driver
+
+def shared_driver():
+    """Return the process-wide browser, starting it on first use."""
+    global _driver
+    with _lock:
+        if _driver is None:
+            started = time.perf_counter()
+            _driver = start_chrome()
+            browser_stats['start_seconds'] += time.perf_counter() - started
+            print(f"🌐 Started headless Chrome in {time.perf_counter() - started:.1f}s.")
+        return _driver
+
+def close_browser():
+    """Quit the shared browser if it was started."""
+    global _driver, _current_account
+    with _lock:
+        if _driver is not None:
+            try:
+                _driver.quit()
+            except Exception as e:
+                print(f"Failed to close Chrome: {e}")
+        _driver = None
+        _current_account = None
+
+atexit.register(close_browser)
+
+def _push_cookies(driver, account):
+    """Replace the browser's cookies with the account's."""
+    global _current_account
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    cookies = []
+    for cookie in account.session.cookies:
+        entry = {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                 'path': cookie.path, 'secure': bool(cookie.secure)}
+        if cookie.expires:
+            entry['expires'] = cookie.expires
+        cookies.append(entry)
+    if cookies:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+    _current_account = account
+
+def _pull_cookies(driver, account):
+    """Copy the browser's cookies into the account's session, for saving and the next swap."""
+    account.session.cookies.clear()
+    for cookie in driver.get_cookies():
+        account.session.cookies.set(
+            cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'),
+            secure=cookie.get('secure', False), expires=cookie.get('expiry')
+        )
+
+def _load(driver, account, url, action):
+    """Run `action`, which loads `url` in the browser, through the politeness limiter and record the load."""
+    limiter = host_limiter(urlsplit(url).netloc)
+    limiter.acquire(config.UCAM_QUEUE_TIMEOUT_SECONDS)
+    started = time.monotonic()
+    ok = False
+    try:
+        action()
+        ok = True
+    except Exception as e:
+        if type(e).__name__ == 'TimeoutException':
+            # Retried and counted by the circuit breaker like an HTTP timeout
+            raise requests.Timeout(f"Chrome page load timed out: {url}") from e
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        limiter.release(elapsed, ok)
+    account.stats['round_trips'] += 1
+    browser_stats['page_loads'] += 1
+    browser_stats['load_seconds'] += elapsed
+    if not browser_stats['fastest_load_seconds'] or elapsed < browser_stats['fastest_load_seconds']:
+        browser_stats['fastest_load_seconds'] = elapsed
+    transferred = driver.execute_script(
+        "const nav = performance.getEntriesByType('navigation')[0]; return nav ? nav.transferSize : 0;"
+    ) or 0
+    browser_stats['bytes_transferred'] += transferred
+    account.stats['bytes_received'] += transferred
+
+def log_in_browser(account):
+    """Log in through the login form in the browser. Returns the mmi, or None if UCAM did not reveal one."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with _lock:
+        driver = shared_driver()
+        account.session.cookies.clear()
+        _push_cookies(driver, account)
+        url = login_url()
+        _load(driver, account, url, lambda: driver.get(url))
+        driver.find_element(By.NAME, USERNAME_FIELD).send_keys(account.user_id)
+        driver.find_element(By.NAME, PASSWORD_FIELD).send_keys(account.password)
+        form_page = driver.find_element(By.TAG_NAME, 'html')
+
+        def submit():
+            driver.find_element(By.NAME, BUTTON_FIELD).click()
+            WebDriverWait(driver, config.BROWSER_PAGE_TIMEOUT_SECONDS).until(EC.staleness_of(form_page))
+
+        _load(driver, account, url, submit)
+        if is_login_page(driver.current_url):
+            raise AuthError("UCAM showed the login form again")
+        _pull_cookies(driver, account)
+        return find_mmi(driver.current_url, driver.page_source)
+
+def fetch_course_page_browser(account, course_url):
+    """Open the course history page for `account`. Returns HTML holding the course table, or None if the session has expired."""
+    from selenium.common.exceptions import NoSuchElementException
+    from selenium.webdriver.common.by import By
+
+    with _lock:
+        driver = shared_driver()
+        if _current_account is not account:
+            _push_cookies(driver, account)
+        _load(driver, account, course_url, lambda: driver.get(course_url))
+        sample_memory()
+        if is_login_page(driver.current_url):
+            return None
+        try:
+            table = driver.find_element(By.ID, config.COURSE_TABLE_ID)
+        except NoSuchElementException:
+            return None
+        # The table alone is all the parser needs; serialising the whole page costs more
+        page_html = table.get_attribute('outerHTML')
+        _pull_cookies(driver, account)
+    account.last_validated = time.time()
+    return page_html
+
+def _parent_pids():
+    """Map pid -> parent pid for every process, from /proc."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; the fields after it do not
+        parents[int(entry)] = int(stat.rsplit(')', 1)[1].split()[1])
+    return parents
+
+def _memory_kb(pid):
+    """Proportional set size of `pid` in KB (RSS on kernels without smaps_rollup)."""
+    for path, field in ((f'/proc/{pid}/smaps_rollup', 'Pss:'), (f'/proc/{pid}/status', 'VmRSS:')):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+def browser_memory_mb():
+    """Memory used by chromedriver and every Chrome process under it, in MB. None if unknown."""
+    if _driver is None or not os.path.isdir('/proc'):
+        return None
+    root = _driver.service.process.pid
+    parents = _parent_pids()
+    tree = {root}
+    grew = True
+    while grew:
+        children = {pid for pid, parent in parents.items() if parent in tree and pid not in tree}
+        tree |= children
+        grew = bool(children)
+    return sum(_memory_kb(pid) for pid in tree) / 1024
+
+def sample_memory():
+    """Record the browser's current memory use."""
+    memory = browser_memory_mb()
+    if memory is not None:
+        browser_stats['memory_mb'] = memory
+        browser_stats['peak_memory_mb'] = max(browser_stats['peak_memory_mb'], memory)
+
+def print_browser_report():
+    """Print page-load time, bytes and memory of the Selenium engine, if it was used."""
+    loads = browser_stats['page_loads']
+    if not loads:
+        return
+    memory = f"{browser_stats['memory_mb']:.0f} MB now, {browser_stats['peak_memory_mb']:.0f} MB peak" \
+        if browser_stats['peak_memory_mb'] else "memory unknown"
+    print(f"🌐 Chrome: {loads} page loads, {browser_stats['load_seconds'] * 1000 / loads:.0f} ms average, "
+          f"{browser_stats['fastest_load_seconds'] * 1000:.0f} ms fastest | "
+          f"{browser_stats['bytes_transferred'] / loads / 1024:.1f} KB/load | {memory}")
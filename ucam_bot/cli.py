@@ -0,0 +1,176 @@
+"""Command-line entry point for the single-account bot."""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from . import IMPORT_STARTED
+from . import config
+from . import notify
+from . import storage
+from .browser import print_browser_report
+from .limiter import print_limiter_report
+from .metrics import print_phase_report, start_metrics
+from .poll import init_running_courses, poll_account, remember_publication
+from .portal import UcamAccount, start_session
+from .retry import print_retry_report
+from .schedule import PollScheduler
+
+IMPORTS_DONE = time.perf_counter()
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Notify on Telegram when UCAM publishes course results.")
+    parser.add_argument('--once', action='store_true',
+                        help="poll once, notify, save state and exit (for cron, systemd timers or CronJobs)")
+    parser.add_argument('--interval', type=float, default=config.POLL_INTERVAL_SECONDS,
+                        help=f"seconds between polls in busy hours (default: {config.POLL_INTERVAL_SECONDS})")
+    parser.add_argument('--schedule', choices=['adaptive', 'fixed'], default=config.POLL_SCHEDULE,
+                        help=f"'adaptive' follows the hours results usually appear, 'fixed' always waits --interval (default: {config.POLL_SCHEDULE})")
+    parser.add_argument('--max-runtime', type=float, default=config.MAX_RUNTIME_SECONDS,
+                        help=f"exit loop mode after this many seconds (default: {config.MAX_RUNTIME_SECONDS:.0f})")
+    parser.add_argument('--startup-budget', type=float, default=config.STARTUP_BUDGET_SECONDS,
+                        help=f"warn when cold start takes longer than this many seconds (default: {config.STARTUP_BUDGET_SECONDS})")
+    parser.add_argument('--metrics-port', type=int, default=config.METRICS_PORT,
+                        help="serve Prometheus metrics on this port at /metrics (default: METRICS_PORT, off if unset)")
+    parser.add_argument('--metrics-file', default=config.METRICS_FILE,
+                        help="write the metrics to this file when the run ends (default: METRICS_FILE)")
+    parser.add_argument('--profile', type=positive_int, metavar='N',
+                        help="run N polls under cProfile and tracemalloc, write reports to --profile-dir and exit")
+    parser.add_argument('--profile-dir', default='profile', help="where --profile writes its reports (default: profile)")
+    return parser.parse_args(argv)
+
+def report_cold_start(timings, budget):
+    """Print how long each startup phase took and warn if the total is over budget."""
+    total = sum(timings.values())
+    phases = ' | '.join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    print(f"⏱️ Cold start {total:.2f}s ({phases})")
+    if total > budget:
+        print(f"⚠️ Cold start exceeded the {budget:.1f}s startup budget.")
+
+def print_poll_summary(account, state, interval, elapsed_time):
+    stats = account.stats
+    polls = max(stats['polls'], 1)
+    print(f"📊 Still monitoring {len(state['running_courses'])} courses | Table cache {stats['fingerprint_hits']} hits / {stats['fingerprint_misses']} misses | {stats['round_trips'] / polls:.2f} requests/poll | Next check in {interval:.0f}s | {elapsed_time/3600:.1f}h runtime")
+    print(f"💾 State writes: {stats['state_writes'] / polls:.2f} docs/poll, {stats['state_write_bytes'] / polls:.0f} B/poll, {stats['state_write_ms'] / max(stats['state_write_batches'], 1):.1f} ms/bulk write")
+    print_phase_report()
+    print_limiter_report()
+    print_retry_report()
+    print_browser_report()
+
+def run_loop(account, state, scheduler, max_runtime, start_time):
+    """Poll on the scheduler's timetable until `max_runtime` seconds after start_time."""
+    running_courses = state['running_courses']
+    if scheduler.adaptive:
+        intervals = [scheduler.interval_for(hour) for hour in range(24)]
+        print(f"\n✅ Bot started. Monitoring {len(running_courses)} courses. Polling every {min(intervals):.0f}-{max(intervals):.0f} seconds depending on the hour.\n")
+    else:
+        print(f"\n✅ Bot started. Monitoring {len(running_courses)} courses. Polling every {scheduler.base_interval:.0f} seconds.\n")
+    print("📋 Courses being monitored:")
+    for i, course in enumerate(running_courses, 1):
+        print(f"   {i}. {course['Course Name']} ({course['Course ID']}) - Trimester: {course['Trimester']}")
+
+    while True:
+        # Check if we're approaching the 6-hour GitHub Actions timeout
+        elapsed_time = time.time() - start_time
+        if elapsed_time > max_runtime:
+            print(f"\n⏰ Reached the {max_runtime/3600:.1f}h runtime limit. Exiting gracefully after {elapsed_time/3600:.1f} hours.")
+            notify.shutdown_dispatcher()
+            storage.flush_state_writes()
+            storage.save_session(account)
+            break
+
+        try:
+            print(f"\n[{datetime.now()}] Checking for published grades...")
+            found = poll_account(account, state)
+            scheduler.record_success()
+            if found:
+                remember_publication(account, state, scheduler)
+            delay = scheduler.next_delay()
+            print_poll_summary(account, state, delay, elapsed_time)
+
+        except Exception as e:
+            print(f"Error during poll: {e}")
+            scheduler.record_failure()
+            delay = scheduler.next_delay()
+            print(f"⏳ {scheduler.failures} failed polls in a row. Retrying in {delay:.0f}s.")
+        time.sleep(min(delay, max(max_runtime - elapsed_time, 0)))
+
+def main(argv=None):
+    args = parse_args(argv)
+    timings = {'imports': IMPORTS_DONE - IMPORT_STARTED}
+    start_metrics(args.metrics_port, args.metrics_file)
+
+    if not config.USER_ID or not config.PASSWORD:
+        print("ERROR: USER_ID and PASSWORD not found in environment variables.")
+        sys.exit(1)
+
+    # A MongoDB handshake runs in the background while we log in to UCAM
+    try:
+        storage.open_store()
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    start_time = time.time()
+
+    # The single-account bot keeps using the original '_id: state' document
+    account = UcamAccount(config.USER_ID, config.PASSWORD, config.TELEGRAM_CHAT_ID, state_id='state')
+
+    started = time.perf_counter()
+    if config.SESSION_KEY and not storage.check_store():
+        # The saved session lives in the store, so it cannot be tried without it
+        sys.exit(1)
+    if not start_session(account):
+        storage.close_store()
+        sys.exit(1)
+    timings['session'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if not config.SESSION_KEY and not storage.check_store():
+        sys.exit(1)
+    timings['store wait'] = time.perf_counter() - started
+
+    exit_code = 0
+    try:
+        # Load persistent state from the store
+        started = time.perf_counter()
+        state = storage.load_bot_state(account.state_id)
+        timings['state'] = time.perf_counter() - started
+
+        # On first run, initialize running_courses from current UCAM data
+        started = time.perf_counter()
+        if not state['running_courses']:
+            init_running_courses(account, state)
+        elif args.once:
+            poll_account(account, state)
+        timings['first poll'] = time.perf_counter() - started
+        report_cold_start(timings, args.startup_budget)
+
+        if args.profile:
+            from .profiling import print_profile_summary, profile_polls
+            summary = profile_polls(account, state, args.profile, args.profile_dir)
+            print_profile_summary(summary, args.profile_dir)
+            print_poll_summary(account, state, 0, time.time() - start_time)
+        elif args.once:
+            notify.shutdown_dispatcher()
+            storage.flush_state_writes()
+            storage.save_session(account)
+            print_poll_summary(account, state, 0, time.time() - start_time)
+        else:
+            scheduler = PollScheduler(state['publication_hours'], adaptive=args.schedule == 'adaptive', base_interval=args.interval)
+            run_loop(account, state, scheduler, args.max_runtime, start_time)
+
+    except Exception as e:
+        print(f"Fatal error: {e}")
+        exit_code = 1
+    finally:
+        notify.shutdown_dispatcher()
+        storage.flush_state_writes()
+        storage.close_store()
+    sys.exit(exit_code)
@@ -0,0 +1,100 @@
+"""Settings read from the environment.
+
+Entry points load .env before importing the package, so these are read once
+at import time. Code refers to them as config.NAME so tools such as the
+benchmarks can override them at runtime.
+"""
+import os
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Point at benchmarks/ucam_standin.py to keep load tests offline
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+POLL_INTERVAL_SECONDS = 60  # Poll every 60 seconds
+# 'adaptive' polls more often in the hours results usually appear and less at other times; 'fixed' always uses the interval
+POLL_SCHEDULE = os.getenv('POLL_SCHEDULE', 'adaptive')
+# Dhaka-time hours treated as busy until publication history says otherwise
+POLL_ACTIVE_HOURS = os.getenv('POLL_ACTIVE_HOURS', '8-23')
+POLL_MIN_INTERVAL_SECONDS = 30
+POLL_MAX_INTERVAL_SECONDS = 900
+# Random spread applied to every delay (0.1 = +/-10%)
+POLL_JITTER = 0.1
+# Publications needed before the recorded history outweighs POLL_ACTIVE_HOURS
+POLL_HISTORY_WEIGHT = 5
+# After a failed poll wait this long, doubling per failure up to POLL_MAX_BACKOFF_SECONDS
+POLL_ERROR_BACKOFF_SECONDS = 30
+POLL_MAX_BACKOFF_SECONDS = 1800
+# Telegram delivery: request timeout, spacing per chat, messages per second overall, attempts per message
+TELEGRAM_TIMEOUT_SECONDS = 10
+TELEGRAM_CHAT_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_CHAT_INTERVAL_SECONDS', '1'))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+TELEGRAM_MAX_ATTEMPTS = 5
+# 429s do not use up attempts, but a message is given up once they have made it wait this long in total
+TELEGRAM_MAX_RATE_LIMIT_WAIT_SECONDS = float(os.getenv('TELEGRAM_MAX_RATE_LIMIT_WAIT_SECONDS', '600'))
+
+# Serve Prometheus metrics on METRICS_HOST:METRICS_PORT (off when unset), and write them to METRICS_FILE at exit
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
+METRICS_FILE = os.getenv('METRICS_FILE')
+
+# GitHub Actions timeout: 6 hours (21600 seconds). Exit after 5.5 hours to be safe.
+MAX_RUNTIME_SECONDS = 5.5 * 3600
+# --once runs should be ready to poll within this many seconds
+STARTUP_BUDGET_SECONDS = 10
+
+BASE_URL = os.getenv('UCAM_BASE_URL', 'https://ucam.uiu.ac.bd')
+COURSE_TABLE_ID = 'ctl00_MainContainer_gvRegisteredCourse'
+# 'stream' stops reading the course page once the table is closed; 'full' downloads it all
+FETCH_MODE = os.getenv('FETCH_MODE', 'stream')
+# When streaming, finish reading a short tail so the connection can go back to the pool
+STREAM_DRAIN_LIMIT = 32 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+# 'http' (default) or 'selenium': headless Chrome as a fallback when the HTTP login breaks
+FETCH_ENGINE = os.getenv('FETCH_ENGINE', 'http')
+# The Selenium engine blocks images, stylesheets and fonts; with this on, scripts too
+BROWSER_BLOCK_SCRIPTS = os.getenv('BROWSER_BLOCK_SCRIPTS', '1') != '0'
+BROWSER_PAGE_TIMEOUT_SECONDS = 30
+# Course table parser: 'lxml' (targeted, default) or 'bs4' (full-document BeautifulSoup)
+PARSER_BACKEND = os.getenv('PARSER_BACKEND', 'lxml')
+# Politeness towards UCAM, shared by every account in the process: average and burst
+# requests per second, the most requests in flight, the latency above which the
+# in-flight limit is halved, and how long a request may queue for a slot
+UCAM_RATE_PER_SECOND = float(os.getenv('UCAM_RATE_PER_SECOND', '5'))
+UCAM_BURST = int(os.getenv('UCAM_BURST', '10'))
+UCAM_MAX_IN_FLIGHT = int(os.getenv('UCAM_MAX_IN_FLIGHT', '8'))
+UCAM_TARGET_LATENCY_SECONDS = float(os.getenv('UCAM_TARGET_LATENCY_SECONDS', '3'))
+UCAM_QUEUE_TIMEOUT_SECONDS = 60
+# Retries per poll across all failure classes, and the backoff between them
+RETRY_BUDGET = 3
+RETRY_BASE_DELAY_SECONDS = 1
+RETRY_MAX_DELAY_SECONDS = 20
+# Timeouts/5xx in a row that open the UCAM circuit, and how long it stays open (doubling up to the max)
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 60
+BREAKER_MAX_COOLDOWN_SECONDS = 900
+
+# Store credentials for re-login if session expires
+USER_ID = os.getenv('USER_ID')
+PASSWORD = os.getenv('PASSWORD')
+
+# Multi-account engine: accounts file and how many accounts talk to UCAM at once
+ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE', 'accounts.json')
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', '16'))
+# Accounts with no courses left are only checked this often
+IDLE_CHECK_INTERVAL_SECONDS = 6 * 3600
+# After results are published for an account, poll it at the shortest interval for this long
+RECENT_PUBLICATION_SECONDS = 3600
+# How often the multi-account engine prints throughput and queue lag
+FLEET_REPORT_SECONDS = 300
+
+# Where state and saved sessions are kept: 'mongo', 'sqlite[:path]' or 'json[:path]'
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'mongo')
+MONGO_URI = os.getenv('MONGO_URI')
+# Hold state writes for up to this many seconds and send them together (0 writes every change at once)
+STATE_WRITE_BEHIND_SECONDS = float(os.getenv('STATE_WRITE_BEHIND_SECONDS', '0'))
+# Fernet key for the saved UCAM session. Session reuse is off without it.
+SESSION_KEY = os.getenv('SESSION_KEY')
+# Saved sessions not validated within this many seconds are not tried
+SESSION_MAX_AGE_SECONDS = int(os.getenv('SESSION_MAX_AGE_SECONDS', str(12 * 3600)))
@@ -0,0 +1,63 @@
+"""Compare course snapshots and report what changed.
+
+Both snapshots are indexed by a normalised course key, so a diff costs one
+pass over each side instead of comparing every saved course with every
+scraped row. Keys are plain tuples of strings whatever form they were stored
+in (MongoDB hands tuples back as lists), so set membership behaves the same
+before and after a round-trip.
+"""
+from collections import namedtuple
+
+GRADE_PUBLISHED = 'grade_published'
+GRADE_CHANGED = 'grade_changed'
+COURSE_ADDED = 'course_added'
+COURSE_DROPPED = 'course_dropped'
+
+# `course` is the current row (None for COURSE_DROPPED), `previous` the saved
+# one (None for COURSE_ADDED)
+CourseEvent = namedtuple('CourseEvent', ['kind', 'key', 'course', 'previous'])
+
+def normalize_key(key):
+    """Return key as a tuple of strings with surrounding and repeated whitespace removed."""
+    return tuple(' '.join(str(part).split()) for part in key)
+
+def course_key(course):
+    """Return a unique identifier for a course."""
+    return normalize_key((course['Course ID'], course['Course Name'], course['Trimester']))
+
+def has_grade(course):
+    """True once both Grade and Point are filled in."""
+    return bool(course.get('Grade', '').strip() and course.get('Point', '').strip())
+
+def grade_of(course):
+    return course.get('Grade', '').strip(), course.get('Point', '').strip()
+
+def index_courses(courses):
+    """Map course_key() to course dict."""
+    return {course_key(course): course for course in courses}
+
+def diff_courses(previous, current):
+    """Return CourseEvents turning `previous` into `current`.
+
+    Either argument may be a list of course dicts or an index from
+    index_courses().
+    """
+    if not isinstance(previous, dict):
+        previous = index_courses(previous)
+    if not isinstance(current, dict):
+        current = index_courses(current)
+
+    events = []
+    for key, course in current.items():
+        old = previous.get(key)
+        if old is None:
+            events.append(CourseEvent(COURSE_ADDED, key, course, None))
+        elif has_grade(course):
+            if not has_grade(old):
+                events.append(CourseEvent(GRADE_PUBLISHED, key, course, old))
+            elif grade_of(course) != grade_of(old):
+                events.append(CourseEvent(GRADE_CHANGED, key, course, old))
+    for key, old in previous.items():
+        if key not in current:
+            events.append(CourseEvent(COURSE_DROPPED, key, None, old))
+    return events
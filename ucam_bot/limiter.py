@@ -0,0 +1,148 @@
+"""Politeness limits for requests to UCAM.
+
+Every UCAM session sends through LimitedAdapter, so login_ucam,
+is_session_valid and get_table_html, redirect hops included, share one
+HostLimiter per host. The limiter combines:
+
+- a token bucket: at most UCAM_RATE_PER_SECOND requests per second on
+  average, with bursts of up to UCAM_BURST;
+- an AIMD concurrency limit: each fast, successful response raises the number
+  of requests allowed in flight by about one per round, and a timeout, 5xx or
+  a response slower than UCAM_TARGET_LATENCY_SECONDS halves it.
+
+A request holds its slot until its body has been read or the response
+closed, so streamed pages count in full towards in-flight and latency.
+
+When the portal slows down the limit shrinks, so requests queue in the bot
+instead of piling up on the server as timeouts.
+"""
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from . import config
+
+# Concurrency limit a new HostLimiter starts from
+INITIAL_LIMIT = 4
+# Multiplicative decrease applied on errors and slow responses
+DECREASE_FACTOR = 0.5
+
+class QueueTimeout(Exception):
+    """No request slot for a host came free in time; retried like a network timeout."""
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency limit for one host."""
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None, target_latency=None):
+        self.rate = rate or config.UCAM_RATE_PER_SECOND
+        self.burst = burst or config.UCAM_BURST
+        self.max_limit = max_in_flight or config.UCAM_MAX_IN_FLIGHT
+        self.target_latency = target_latency or config.UCAM_TARGET_LATENCY_SECONDS
+        self.limit = float(min(INITIAL_LIMIT, self.max_limit))
+        self.tokens = float(self.burst)
+        self.in_flight = 0
+        self.stats = Counter()
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self, timeout=None):
+        """Wait for a token and a free slot. Raises QueueTimeout if none is available within `timeout` seconds."""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.in_flight < max(int(self.limit), 1) and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    self.stats['requests'] += 1
+                    self.stats['wait_seconds'] += now - started
+                    return
+                # Out of tokens: sleep until the next one; out of slots: until a release
+                wait = (1 - self.tokens) / self.rate if self.tokens < 1 else None
+                if deadline is not None:
+                    if now >= deadline:
+                        self.stats['queue_timeouts'] += 1
+                        raise QueueTimeout(f"No UCAM request slot free within {timeout:.0f}s")
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+
+    def release(self, latency, ok):
+        """Record how a request went and adjust the concurrency limit."""
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if ok and latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.stats['errors' if not ok else 'slow'] += 1
+                # Requests already in flight when trouble started report it too; decrease once per window
+                if now - self._decreased_at >= self.target_latency:
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                    self._decreased_at = now
+                    self.stats['decreases'] += 1
+            self._condition.notify_all()
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def host_limiter(host):
+    """Return the process-wide limiter for `host`."""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = HostLimiter()
+        return limiter
+
+class LimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that sends every request through its host's HostLimiter."""
+
+    def send(self, request, **kwargs):
+        limiter = host_limiter(urlsplit(request.url).netloc)
+        limiter.acquire(config.UCAM_QUEUE_TIMEOUT_SECONDS)
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except BaseException:
+            limiter.release(time.monotonic() - started, False)
+            raise
+        ok = response.status_code < 500
+
+        # send() returns once the headers are in; the body is read afterwards, all
+        # at once by requests or bit by bit with stream=True. urllib3 calls
+        # release_conn() when the body is used up or the response is closed.
+        raw = response.raw
+        release_conn = getattr(raw, 'release_conn', None)
+        if release_conn is None:
+            limiter.release(time.monotonic() - started, ok)
+            return response
+        released = False
+
+        def release_slot():
+            nonlocal released
+            if not released:
+                released = True
+                limiter.release(time.monotonic() - started, ok)
+            release_conn()
+
+        raw.release_conn = release_slot
+        return response
+
+def print_limiter_report():
+    """Print the current limit and queueing figures for every host contacted so far."""
+    with _limiters_lock:
+        limiters = list(_limiters.items())
+    for host, limiter in limiters:
+        stats = limiter.stats
+        print(f"🚦 {host}: up to {int(limiter.limit)} requests in flight | "
+              f"{stats['wait_seconds'] * 1000 / max(stats['requests'], 1):.0f} ms queued/request | "
+              f"{stats['errors']} errors, {stats['slow']} slow, {stats['decreases']} slowdowns")
@@ -0,0 +1,151 @@
+"""Logging in to UCAM.
+
+Login.aspx is an ASP.NET form: the POST has to carry the page's hidden
+fields (__VIEWSTATE, __EVENTVALIDATION and friends) along with the
+credentials. Only those <input> tags are read, by string search, instead of
+parsing the whole page. The first login records a FormTemplate (where the
+form posts and which hidden fields it has); later logins look up just those
+fields and fall back to a full scan if the page no longer matches.
+
+UCAM answers a good login with a redirect away from Login.aspx and a bad one
+by showing the form again, so success is decided from the redirect target.
+"""
+import html
+import re
+from urllib.parse import urljoin, urlsplit
+
+from . import config
+from . import metrics
+from .retry import AuthError
+
+LOGIN_PATH = '/Security/Login.aspx'
+USERNAME_FIELD = 'ctl00$logMain$UserName'
+PASSWORD_FIELD = 'ctl00$logMain$Password'
+BUTTON_FIELD = 'ctl00$logMain$Button1'
+BUTTON_VALUE = 'Sign In'
+
+INPUT_TAG = re.compile(r'<input\b[^>]*>', re.I)
+FORM_TAG = re.compile(r'<form\b[^>]*>', re.I)
+ATTRIBUTE = re.compile(r'''([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+MMI = re.compile(r'mmi=([a-zA-Z0-9]+)')
+
+def login_url():
+    """Absolute URL of the login form on BASE_URL."""
+    return f'{config.BASE_URL}{LOGIN_PATH}'
+
+def is_login_page(url):
+    """True if `url` is a login page (UCAM has been seen to use more than one path)."""
+    return 'login.aspx' in urlsplit(url).path.lower()
+
+def tag_attributes(tag):
+    """Return the attributes of one HTML start tag as a dict with lower-case names."""
+    attributes = {}
+    for name, double, single, bare in ATTRIBUTE.findall(tag):
+        attributes.setdefault(name.lower(), html.unescape(double or single or bare))
+    return attributes
+
+def extract_hidden_fields(page_html):
+    """Return {name: value} for every named <input type="hidden"> on the page, in page order."""
+    fields = {}
+    for match in INPUT_TAG.finditer(page_html):
+        tag = match.group()
+        if 'hidden' not in tag.lower():
+            continue
+        attributes = tag_attributes(tag)
+        if attributes.get('type', '').lower() == 'hidden' and attributes.get('name'):
+            fields[attributes['name']] = attributes.get('value', '')
+    return fields
+
+def form_action(page_html, page_url):
+    """Absolute URL the first form on the page posts to, or `page_url` if it has none."""
+    match = FORM_TAG.search(page_html)
+    action = tag_attributes(match.group()).get('action') if match else None
+    return urljoin(page_url, action) if action else page_url
+
+class FormTemplate:
+    """The parts of the login form that stay the same between logins."""
+
+    def __init__(self, action, names, hidden_count):
+        self.action = action
+        self.names = names
+        # Number of 'type="hidden"' occurrences on the page, to notice added fields
+        self.hidden_count = hidden_count
+
+    def read(self, page_html):
+        """Return the hidden fields of a login page matching this template, or None if it does not match."""
+        if page_html.count('type="hidden"') != self.hidden_count:
+            return None
+        fields = {}
+        for name in self.names:
+            at = page_html.find(f'name="{name}"')
+            if at == -1:
+                return None
+            start = page_html.rfind('<', 0, at)
+            end = page_html.find('>', at)
+            if start == -1 or end == -1:
+                return None
+            fields[name] = tag_attributes(page_html[start:end + 1]).get('value', '')
+        return fields
+
+# FormTemplate per login URL, shared by every account in the process
+_templates = {}
+
+def login_form_data(page_html, page_url):
+    """Return (action URL, hidden fields) for the login page, using and refreshing the cached template."""
+    template = _templates.get(page_url)
+    if template is not None:
+        fields = template.read(page_html)
+        if fields is not None:
+            metrics.inc('ucam_login_form_reads_total', method='template')
+            return template.action, fields
+    metrics.inc('ucam_login_form_reads_total', method='full_scan')
+    fields = extract_hidden_fields(page_html)
+    template = FormTemplate(form_action(page_html, page_url), list(fields), page_html.count('type="hidden"'))
+    _templates[page_url] = template
+    return template.action, fields
+
+def find_mmi(*texts):
+    """Return the first mmi value found in the given URLs or pages, or None."""
+    for text in texts:
+        match = MMI.search(text) if text else None
+        if match:
+            return match.group(1)
+    return None
+
+def log_in(session, user_id, password):
+    """Log in on `session`. Returns the mmi parameter, or None if UCAM did not reveal one.
+
+    One GET of the form and one POST. The redirect after a good login is only
+    followed when its Location does not already carry the mmi. Raises
+    AuthError if UCAM shows the login form again, and lets network errors and
+    5xx responses through for call_with_retries() to classify.
+    """
+    url = login_url()
+    response = session.get(url, timeout=10, allow_redirects=True)
+    response.raise_for_status()
+    action, form_data = login_form_data(response.text, response.url)
+
+    form_data[USERNAME_FIELD] = user_id
+    form_data[PASSWORD_FIELD] = password
+    form_data[BUTTON_FIELD] = BUTTON_VALUE
+
+    response = session.post(action, data=form_data, timeout=10, allow_redirects=False)
+    response.close()
+    response.raise_for_status()
+    location = response.headers.get('Location')
+    if not response.is_redirect or not location:
+        raise AuthError("UCAM showed the login form again")
+    target = urljoin(action, location)
+    if is_login_page(target):
+        raise AuthError("UCAM redirected back to the login page")
+
+    mmi = find_mmi(target)
+    if mmi is None:
+        # Cookies set on the landing page are kept, and the page usually links the mmi
+        metrics.inc('ucam_login_landing_fetches_total')
+        landing = session.get(target, timeout=10, allow_redirects=True)
+        landing.raise_for_status()
+        if is_login_page(landing.url):
+            raise AuthError("UCAM sent the new session back to the login page")
+        mmi = find_mmi(landing.url, landing.text)
+    return mmi
@@ -0,0 +1,73 @@
+"""Telegram message text for a published grade."""
+
+def get_message_for_course(course, grade, point):
+    """Generate Telegram message based on grade."""
+    if grade == "A" and point == 4.00:
+        emoji = "🏆🔥"
+        tone = "OUTSTANDING ACHIEVEMENT!"
+        celebration = "🗿🗿🗿 ABSOLUTE LEGEND! 🗿🗿🗿"
+        encouragement = "You're absolutely crushing it! 90-100%! 🚀"
+    elif grade == "A-" and point == 3.67:
+        emoji = "😔💔"
+        tone = "So close to perfection..."
+        celebration = "😞 Almost there but not quite... 😞"
+        encouragement = "86-89%... You were just a few points away from greatness 😢"
+    elif grade == "B+" and point == 3.33:
+        emoji = "😰📉"
+        tone = "Disappointing Performance"
+        celebration = "💔 Could have been better 💔"
+        encouragement = "82-85%... This is mediocre at best 😤"
+    elif grade == "B" and point == 3.00:
+        emoji = "😰🙁"
+        tone = "Below Expectations"
+        celebration = "😔 This is just average 😔"
+        encouragement = "78-81%... Everyone else is probably doing better than this 😢"
+    elif grade == "B-" and point == 2.67:
+        emoji = "😰😤"
+        tone = "Concerning Results"
+        celebration = "😰 This is worrying 😰"
+        encouragement = "74-77%... Your parents probably expected more 😔"
+    elif grade == "C+" and point == 2.33:
+        emoji = "😞📉"
+        tone = "Poor Performance"
+        celebration = "😢 This is barely acceptable 😢"
+        encouragement = "70-73%... You're falling behind everyone else 😔"
+    elif grade == "C" and point == 2.00:
+        emoji = "😭😭"
+        tone = "Struggling Hard"
+        celebration = "😭 This is embarrassing 😭"
+        encouragement = "66-69%... You really need to step up your game 😔"
+    elif grade == "C-" and point == 1.67:
+        emoji = "🤦‍♂️💩"
+        tone = "This is Bad"
+        celebration = "😤 What happened here? 😤"
+        encouragement = "62-65%... This is really disappointing 😔"
+    elif grade == "D+" and point == 1.33:
+        emoji = "😰☠️"
+        tone = "Terrible Performance"
+        celebration = "😤 This is unacceptable 😤"
+        encouragement = "58-61%... You barely scraped by 😔"
+    elif grade == "D" and point == 1.00:
+        emoji = "😵☠️"
+        tone = "Rock Bottom"
+        celebration = "😵 Barely surviving 😵"
+        encouragement = "55-57%... This is the minimum to not fail 😔"
+    else:  # F grade
+        emoji = "💀⚰️"
+        tone = "Complete Failure"
+        celebration = "😭😭😭 TOTAL DISASTER 😭😭😭"
+        encouragement = "You failed... Time to face the disappointment 😔"
+
+    message = (
+        f"{emoji} <b>{celebration}</b>\n\n"
+        f"🎊 <b>{tone}</b>\n"
+        f"{encouragement}\n\n"
+        f"📚 Course: <b>{course['Course Name'].strip()}</b>\n"
+        f"🆔 Course ID: <b>{course['Course ID'].strip()}</b>\n"
+        f"📅 Trimester: {course['Trimester'].strip()}\n"
+        f"💳 Credit: {course['Credit'].strip()}\n"
+        f"🏆 Grade: <b>{grade}</b>\n"
+        f"📊 Point: <b>{point}</b>\n\n"
+        f"🎉 Keep up the amazing work! 🎉"
+    )
+    return message
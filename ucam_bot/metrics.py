@@ -0,0 +1,216 @@
+"""Timing hooks and counters, exported in the Prometheus text format.
+
+    with phase('fetch'):                 ucam_phase_seconds{phase="fetch"}
+    with timed('ucam_poll_seconds'):     any other histogram
+    inc('ucam_logins_total', result='ok')
+    set_gauge('ucam_circuit_open', 1, circuit='UCAM')
+
+The poll path records the phases login, session_check, fetch, parse, diff,
+notify (one Telegram request) and persist (one bulk write to the state
+store), plus polls, logins and how their form was read, failures and retries
+by class, session expiries, Telegram deliveries and the circuit breaker state; multi_account.py adds
+the fleet queue's throughput and lag. start_metrics() serves
+GET /metrics on METRICS_HOST:METRICS_PORT and, with METRICS_FILE set,
+writes the same text there when the process exits. Recording is a dict
+update under a lock, cheap next to a single request to UCAM.
+"""
+import atexit
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from . import config
+
+PHASES = ('login', 'session_check', 'fetch', 'parse', 'diff', 'notify', 'persist')
+# Upper bounds (seconds) of the histogram buckets; +Inf is implied
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'ucam_phase_seconds': ('histogram', "Time spent in each stage of a poll."),
+    'ucam_poll_seconds': ('histogram', "Time of one whole poll_account() call."),
+    'ucam_polls_total': ('counter', "Polls started."),
+    'ucam_logins_total': ('counter', "Logins to UCAM by result."),
+    'ucam_login_form_reads_total': ('counter', "Login forms read from the cached template or by a full scan."),
+    'ucam_login_landing_fetches_total': ('counter', "Logins that had to fetch the landing page for the mmi."),
+    'ucam_session_expiries_total': ('counter', "Course page fetches that found the session expired."),
+    'ucam_failures_total': ('counter', "Failed calls to UCAM by failure class."),
+    'ucam_retries_total': ('counter', "Retries by failure class."),
+    'ucam_telegram_messages_total': ('counter', "Telegram deliveries by result."),
+    'ucam_state_writes_total': ('counter', "Documents written to the state store."),
+    'ucam_circuit_open': ('gauge', "1 while the circuit breaker is open or half-open."),
+    'ucam_queue_dispatched_total': ('counter', "Accounts taken off the fleet queue for a poll."),
+    'ucam_queue_expedited_total': ('counter', "Accounts moved forward after results for their trimester."),
+    'ucam_queue_polls_per_minute': ('gauge', "Fleet polls per minute since the queue started."),
+    'ucam_queue_accounts': ('gauge', "Accounts waiting in the fleet queue."),
+    'ucam_queue_lag_seconds': ('gauge', "How long due accounts waited for a poll slot, over the last 1000 polls."),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+# (name, labels) -> [count per bucket..., count over the last bucket], sum, count
+_histograms = {}
+_server = None
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, amount=1, **labels):
+    """Add `amount` to a counter."""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram."""
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        histogram[0][bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+class timed:
+    """Context manager that observes how long its block took, whether or not it raised."""
+
+    __slots__ = ('name', 'labels', 'started')
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+def phase(name):
+    """Time one stage of a poll."""
+    return timed('ucam_phase_seconds', phase=name)
+
+def observe_phase(name, seconds):
+    observe('ucam_phase_seconds', seconds, phase=name)
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        series = {}
+        for (name, labels), value in _counters.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), value in _gauges.items():
+            series.setdefault(name, []).append((labels, value))
+        for (name, labels), (buckets, total, count) in _histograms.items():
+            series.setdefault(name, []).append((labels, (list(buckets), total, count)))
+
+    lines = []
+    for name in sorted(series):
+        kind, text = HELP.get(name, ('histogram' if isinstance(series[name][0][1], tuple) else 'counter', name))
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series[name]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            buckets, total, count = value
+            cumulative = 0
+            for bound, in_bucket in zip(BUCKETS, buckets):
+                cumulative += in_bucket
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total!r}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(path=None):
+    """Write render() to `path` (default METRICS_FILE), replacing it atomically."""
+    path = path or config.METRICS_FILE
+    if not path:
+        return
+    temporary = f'{path}.tmp'
+    try:
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(render())
+        os.replace(temporary, path)
+    except OSError as e:
+        print(f"Failed to write metrics to {path}: {e}")
+
+atexit.register(write_metrics_file)
+
+def start_metrics(port=None, path=None):
+    """Serve /metrics on METRICS_PORT (if set) and write METRICS_FILE at exit (if set)."""
+    global _server
+    port = config.METRICS_PORT if port is None else port
+    if path:
+        config.METRICS_FILE = path
+    if port is None or _server is not None:
+        return
+
+    import http.server
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        _server = http.server.ThreadingHTTPServer((config.METRICS_HOST, port), Handler)
+    except OSError as e:
+        print(f"⚠️ Could not serve metrics on {config.METRICS_HOST}:{port}: {e}")
+        return
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+    host, port = _server.server_address[:2]
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+
+def stop_metrics():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+def print_phase_report():
+    """Print the average time of each poll stage recorded so far."""
+    with _lock:
+        averages = {dict(labels)['phase']: total / count
+                    for (name, labels), (_, total, count) in _histograms.items() if name == 'ucam_phase_seconds' and count}
+    if averages:
+        print("⏱️ Average per stage: " + ' | '.join(
+            f"{name} {averages[name] * 1000:.1f} ms" for name in PHASES if name in averages))
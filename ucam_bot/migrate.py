@@ -0,0 +1,61 @@
+"""Copy bot state and saved sessions from one backend to another.
+
+Usage:
+    python -m ucam_bot.migrate SOURCE DESTINATION
+
+SOURCE and DESTINATION are backend specs as in STATE_BACKEND, for example:
+    python -m ucam_bot.migrate mongo sqlite:bot_state.db
+    python -m ucam_bot.migrate json:running_courses.json sqlite:bot_state.db
+
+Documents are copied as they are. A running_courses.json from bot_v0.py, or
+a whole-state document from an older bot_v2.py, becomes per-course
+documents the first time the bot loads it from the destination.
+"""
+import argparse
+import os
+import sys
+
+from . import config
+from .backends import COLLECTIONS, open_backend
+
+def copy_documents(source, destination):
+    """Copy every document from `source` to `destination`. Returns counts per collection."""
+    counts = {}
+    for collection in COLLECTIONS:
+        docs = source.find(collection)
+        if docs:
+            destination.write({
+                (collection, doc['_id']): {'$set': {field: value for field, value in doc.items() if field != '_id'}}
+                for doc in docs
+            })
+        counts[collection] = len(docs)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy UCAM bot state between storage backends.")
+    parser.add_argument('source', help="backend to read, e.g. mongo, sqlite:bot_state.db or json:running_courses.json")
+    parser.add_argument('destination', help="backend to write, e.g. sqlite:bot_state.db")
+    args = parser.parse_args(argv)
+
+    # .env is loaded after config was imported when run with -m
+    mongo_uri = os.getenv('MONGO_URI') or config.MONGO_URI
+    try:
+        source = open_backend(args.source, mongo_uri)
+        destination = open_backend(args.destination, mongo_uri)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    try:
+        if not source.check() or not destination.check():
+            sys.exit(1)
+        counts = copy_documents(source, destination)
+    finally:
+        source.close()
+        destination.close()
+    summary = ', '.join(f"{count} {collection}" for collection, count in counts.items())
+    print(f"✅ Copied {summary} from {args.source} to {args.destination}.")
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
@@ -0,0 +1,249 @@
+"""Watch many UCAM accounts from one process.
+
+Each account gets its own cookie jar and mmi value, while every session
+shares one pooled HTTP connection to UCAM. The blocking helpers from
+ucam_bot (login_ucam, get_table_html, extract_courses) run on a thread pool
+driven by asyncio, so one process can check hundreds of students instead of
+one student per runner.
+
+Accounts are polled in order of a next-due time that depends on the hour,
+how many courses they still wait on, recent results and recent errors (see
+schedule.fleet_delay). Students who have all their grades are only checked
+every IDLE_CHECK_INTERVAL_SECONDS, for courses of a new trimester. At most
+MAX_CONCURRENCY polls run at once. Throughput and queue lag are exported as
+metrics and printed every FLEET_REPORT_SECONDS.
+
+accounts.json is a list of objects:
+    [{"user_id": "0112345678", "password": "...", "telegram_chat_id": "..."}]
+"telegram_chat_id" is optional and defaults to TELEGRAM_CHAT_ID.
+
+Usage:
+    python multi_account.py [accounts.json]
+    python -m ucam_bot.multi_account [accounts.json]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from . import metrics
+from . import notify
+from . import storage
+from .browser import print_browser_report
+from .limiter import LimitedAdapter, print_limiter_report
+from .poll import init_running_courses, poll_account, refresh_running_courses, remember_publication
+from .portal import UcamAccount, new_session, start_session
+from .retry import print_retry_report
+from .schedule import AccountQueue, PollScheduler, fleet_delay
+from .storage import load_bot_state, save_session
+
+def load_accounts(path, adapter):
+    """Read accounts from a JSON file, giving each its own session on the shared adapter."""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+
+    accounts = []
+    for entry in entries:
+        accounts.append(UcamAccount(
+            entry['user_id'],
+            entry['password'],
+            entry.get('telegram_chat_id'),
+            session=new_session(adapter),
+        ))
+    return accounts
+
+class WatchedAccount:
+    """One account plus what the fleet scheduler knows about it."""
+
+    def __init__(self, account):
+        self.account = account
+        # Loaded on the account's first successful turn
+        self.state = None
+        self.scheduler = PollScheduler(adaptive=config.POLL_SCHEDULE == 'adaptive')
+        self.last_published_at = None
+
+    def pending(self):
+        return len(self.state['running_courses']) if self.state else 0
+
+    def trimesters(self):
+        return {c['Trimester'].strip() for c in self.state['running_courses']} if self.state else set()
+
+def start_watching(watched):
+    """First turn of an account: log in, load state and find running courses. Returns False to try again later."""
+    account = watched.account
+    if not start_session(account):
+        print(f"❌ [{account.user_id}] Login failed. Will try again later.")
+        return False
+
+    state = load_bot_state(account.state_id)
+    try:
+        if not state['running_courses']:
+            init_running_courses(account, state)
+    except Exception as e:
+        print(f"❌ [{account.user_id}] Failed to initialize running courses: {e}")
+        return False
+    if state['publication_hours']:
+        watched.scheduler.history = list(state['publication_hours'])
+    watched.state = state
+    return True
+
+def take_turn(watched):
+    """Poll one account once. Returns the number of newly published grades.
+
+    An account with no running courses has nothing to diff against, so its
+    course list is read again instead, which picks up a new trimester.
+    """
+    account = watched.account
+    try:
+        if not watched.pending():
+            refresh_running_courses(account, watched.state)
+            found = 0
+        else:
+            found = poll_account(account, watched.state)
+    except Exception as e:
+        watched.scheduler.record_failure()
+        print(f"[{account.user_id}] Error during poll: {e}")
+        return 0
+    watched.scheduler.record_success()
+    if found:
+        watched.last_published_at = time.time()
+        remember_publication(account, watched.state, watched.scheduler)
+    return found
+
+def export_queue_metrics(queue):
+    """Copy the queue's throughput and lag figures to the metrics gauges."""
+    figures = queue.metrics()
+    metrics.set_gauge('ucam_queue_polls_per_minute', figures['polls_per_minute'])
+    metrics.set_gauge('ucam_queue_accounts', figures['queued'])
+    for quantile, field in (('0.5', 'lag_p50_seconds'), ('0.95', 'lag_p95_seconds'), ('1', 'lag_max_seconds')):
+        metrics.set_gauge('ucam_queue_lag_seconds', figures[field], quantile=quantile)
+    return figures
+
+def print_fleet_report(queue, watched):
+    figures = export_queue_metrics(queue)
+    active = sum(1 for w in watched.values() if w.pending())
+    print(f"📈 {figures['polls_per_minute']:.1f} polls/min | queue lag p50 {figures['lag_p50_seconds']:.1f}s, "
+          f"p95 {figures['lag_p95_seconds']:.1f}s, max {figures['lag_max_seconds']:.1f}s | "
+          f"{active} accounts with open courses, {len(watched) - active} finished or not started | "
+          f"{figures['expedited']} expedited")
+    metrics.print_phase_report()
+    print_limiter_report()
+    print_retry_report()
+    print_browser_report()
+
+async def run(accounts, concurrency=None, max_runtime=None):
+    """Poll all accounts until max_runtime seconds have passed, most urgent first.
+
+    An AccountQueue holds every account's next-due time and at most
+    `concurrency` polls run at once. When one account gets results, other
+    accounts waiting on the same trimester are moved forward.
+    """
+    concurrency = concurrency or config.MAX_CONCURRENCY
+    max_runtime = max_runtime or config.MAX_RUNTIME_SECONDS
+    deadline = time.time() + max_runtime
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    queue_changed = asyncio.Event()
+    queue = AccountQueue()
+    watched = {account.state_id: WatchedAccount(account) for account in accounts}
+    tasks = set()
+
+    # Spread the first logins over the poll interval instead of hitting UCAM in bursts
+    stagger = config.POLL_INTERVAL_SECONDS / max(len(accounts), 1)
+    now = time.time()
+    for i, key in enumerate(watched):
+        queue.push(key, now + i * stagger)
+
+    async def turn(entry):
+        try:
+            if entry.state is None:
+                if not await loop.run_in_executor(executor, start_watching, entry):
+                    entry.scheduler.record_failure()
+            else:
+                trimesters = entry.trimesters()
+                if await loop.run_in_executor(executor, take_turn, entry):
+                    now = time.time()
+                    for other in watched.values():
+                        if other is not entry and other.trimesters() & trimesters:
+                            queue.expedite(other.account.state_id, now + other.scheduler.rng.uniform(0, other.scheduler.min_interval))
+        except Exception as e:
+            entry.scheduler.record_failure()
+            print(f"[{entry.account.user_id}] Error during turn: {e}")
+        finally:
+            # Always back in the queue; failed turns come back after the scheduler's backoff
+            now = time.time()
+            queue.push(entry.account.state_id, now + fleet_delay(entry.scheduler, entry.pending(), entry.last_published_at, now))
+            export_queue_metrics(queue)
+            slots.release()
+            queue_changed.set()
+
+    next_report = time.time() + config.FLEET_REPORT_SECONDS
+    try:
+        while time.time() < deadline:
+            now = time.time()
+            if now >= next_report:
+                print_fleet_report(queue, watched)
+                next_report = now + config.FLEET_REPORT_SECONDS
+
+            await slots.acquire()
+            queue_changed.clear()
+            key = queue.pop()
+            if key is None:
+                slots.release()
+                due = queue.next_due()
+                now = time.time()
+                timeout = min(deadline, next_report, due if due is not None else deadline) - now
+                try:
+                    await asyncio.wait_for(queue_changed.wait(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(turn(watched[key]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        print_fleet_report(queue, watched)
+        for entry in watched.values():
+            if entry.state is None:
+                continue
+            await loop.run_in_executor(executor, save_session, entry.account)
+            stats = entry.account.stats
+            print(f"[{entry.account.user_id}] Done. Table cache {stats['fingerprint_hits']} hits / {stats['fingerprint_misses']} misses. State writes {stats['state_writes']} docs in {stats['state_write_batches']} bulk writes, {stats['state_write_ms']:.0f} ms.")
+    finally:
+        executor.shutdown(wait=True)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else config.ACCOUNTS_FILE
+    if not os.path.exists(path):
+        print(f"ERROR: Accounts file {path} not found.")
+        sys.exit(1)
+
+    # One connection pool shared by every account's session
+    adapter = LimitedAdapter(pool_connections=1, pool_maxsize=config.MAX_CONCURRENCY)
+    accounts = load_accounts(path, adapter)
+    print(f"Loaded {len(accounts)} accounts from {path}.")
+    metrics.start_metrics()
+
+    try:
+        storage.open_store()
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    if not storage.check_store():
+        sys.exit(1)
+    try:
+        asyncio.run(run(accounts))
+    finally:
+        notify.shutdown_dispatcher()
+        storage.flush_state_writes()
+        adapter.close()
+        storage.close_store()
+
+if __name__ == '__main__':
+    main()
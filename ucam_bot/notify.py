@@ -0,0 +1,264 @@
+"""Telegram notifications.
+
+TelegramDispatcher delivers messages from a background thread so the poll
+loop never waits on api.telegram.org. It keeps one pooled HTTPS session,
+spaces messages per chat and globally, honours 429 `retry_after` (up to
+TELEGRAM_MAX_RATE_LIMIT_WAIT_SECONDS in total per message), and retries
+network errors and 5xx with exponential backoff.
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from . import config
+from . import metrics
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = '\n\n➖➖➖➖➖➖➖➖\n\n'
+
+_http = None
+
+def _telegram_session():
+    """Return the shared HTTPS session for api.telegram.org."""
+    global _http
+    if _http is None:
+        _http = requests.Session()
+    return _http
+
+def _post_message(text, chat_id):
+    url = f'{config.TELEGRAM_API_URL}/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage'
+    data = {'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}
+    with metrics.phase('notify'):
+        return _telegram_session().post(url, data=data, timeout=config.TELEGRAM_TIMEOUT_SECONDS)
+
+def send_telegram_message(message, chat_id=None):
+    """Send one message right away. Returns True on success."""
+    try:
+        response = _post_message(message, chat_id or config.TELEGRAM_CHAT_ID)
+        ok = response.status_code == 200
+    except Exception as e:
+        print(f"Failed to send Telegram message: {e}")
+        ok = False
+    metrics.inc('ucam_telegram_messages_total', result='sent' if ok else 'failed')
+    return ok
+
+def digest_parts(messages, limit=MAX_MESSAGE_LENGTH):
+    """Combine messages into as few Telegram messages as fit within `limit` characters.
+
+    Returns (text, indexes) pairs, `indexes` being the positions in
+    `messages` that each text carries.
+    """
+    if len(messages) == 1:
+        return [(messages[0], [0])]
+
+    header = f"📬 <b>{len(messages)} results published!</b>"
+    parts = []
+    current = header
+    indexes = []
+    for i, message in enumerate(messages):
+        candidate = current + DIGEST_SEPARATOR + message
+        if len(candidate) > limit and current != header:
+            parts.append((current, indexes))
+            current = message
+            indexes = [i]
+        else:
+            current = candidate
+            indexes.append(i)
+    parts.append((current, indexes))
+    return parts
+
+def build_digest(messages, limit=MAX_MESSAGE_LENGTH):
+    """The texts of digest_parts()."""
+    return [text for text, _ in digest_parts(messages, limit)]
+
+class _Job:
+    def __init__(self, chat_id, text, on_done):
+        self.chat_id = chat_id
+        self.text = text
+        self.on_done = on_done
+        self.attempts = 0
+        # Seconds 429 responses have told this job to wait so far
+        self.rate_limited_wait = 0.0
+
+class TelegramDispatcher:
+    """Queue of outgoing Telegram messages delivered by one worker thread."""
+
+    def __init__(self, chat_interval=None, global_rate=None, max_attempts=None):
+        self.chat_interval = config.TELEGRAM_CHAT_INTERVAL_SECONDS if chat_interval is None else chat_interval
+        self.global_interval = 1.0 / (global_rate or config.TELEGRAM_GLOBAL_RATE)
+        self.max_attempts = max_attempts or config.TELEGRAM_MAX_ATTEMPTS
+        self.stats = Counter()
+        # (not_before, sequence, job); scanned for the first sendable job so a
+        # rate-limited chat does not hold up the others
+        self._queue = []
+        self._sequence = itertools.count()
+        self._chat_ready_at = {}
+        self._next_send_at = 0.0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='telegram', daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, chat_id, messages, on_done=None):
+        """Queue messages for one chat without blocking.
+
+        Several messages are coalesced into one digest, which may take more
+        than one Telegram message. Once every part was delivered or given up
+        on, `on_done(delivered)` is called from the worker thread with one
+        bool per message in `messages`, so a failed part only fails the
+        messages it carried.
+        """
+        parts = digest_parts(messages)
+        self.stats['coalesced'] += len(messages) - len(parts)
+        delivered = [False] * len(messages)
+        remaining = [len(parts)]
+
+        def part_done(indexes, ok):
+            for i in indexes:
+                delivered[i] = ok
+            remaining[0] -= 1
+            if remaining[0] == 0 and on_done is not None:
+                on_done(delivered)
+
+        with self._condition:
+            for text, indexes in parts:
+                self._push(0.0, _Job(chat_id, text, lambda ok, indexes=indexes: part_done(indexes, ok)))
+            self._condition.notify()
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been delivered or dropped. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=30):
+        """Deliver what is queued (up to `timeout` seconds) and stop the worker."""
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if not flushed:
+            print(f"⚠️ {len(self._queue)} Telegram messages were still queued at shutdown.")
+        return flushed
+
+    def _push(self, not_before, job):
+        self._queue.append((not_before, next(self._sequence), job))
+
+    def _next_job(self):
+        """Pop the next job that may be sent now, waiting as needed. Returns None when stopping."""
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                ready_at, entry = min(
+                    (max(not_before, self._chat_ready_at.get(job.chat_id, 0.0), self._next_send_at), (not_before, seq, job))
+                    for not_before, seq, job in self._queue
+                )
+                wait = ready_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                self._queue.remove(entry)
+                job = entry[2]
+                self._in_flight += 1
+                now = time.monotonic()
+                self._next_send_at = now + self.global_interval
+                self._chat_ready_at[job.chat_id] = now + self.chat_interval
+                return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._deliver(job)
+            except Exception as e:
+                print(f"Telegram dispatcher error: {e}")
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _deliver(self, job):
+        job.attempts += 1
+        retry_in = None
+        try:
+            response = _post_message(job.text, job.chat_id)
+            if response.status_code == 200:
+                self.stats['sent'] += 1
+                metrics.inc('ucam_telegram_messages_total', result='sent')
+                job.on_done(True)
+                return
+            if response.status_code == 429:
+                self.stats['rate_limited'] += 1
+                metrics.inc('ucam_telegram_messages_total', result='rate_limited')
+                try:
+                    retry_in = float(response.json()['parameters']['retry_after'])
+                except Exception:
+                    retry_in = 5.0
+                # A 429 does not count against the attempt limit, only against the total wait
+                job.attempts -= 1
+                job.rate_limited_wait += retry_in
+                if job.rate_limited_wait > config.TELEGRAM_MAX_RATE_LIMIT_WAIT_SECONDS:
+                    print(f"Failed to send Telegram message: still rate limited after {job.rate_limited_wait:.0f}s")
+                    retry_in = None
+                else:
+                    with self._condition:
+                        self._chat_ready_at[job.chat_id] = time.monotonic() + retry_in
+            elif response.status_code >= 500:
+                retry_in = 2 ** job.attempts
+            else:
+                print(f"Failed to send Telegram message: HTTP {response.status_code} {response.text[:200]}")
+        except requests.RequestException as e:
+            print(f"Failed to send Telegram message: {e}")
+            retry_in = 2 ** job.attempts
+
+        if retry_in is not None and job.attempts < self.max_attempts:
+            self.stats['retries'] += 1
+            metrics.inc('ucam_telegram_messages_total', result='retried')
+            with self._condition:
+                self._push(time.monotonic() + retry_in, job)
+                self._condition.notify()
+            return
+
+        self.stats['failed'] += 1
+        metrics.inc('ucam_telegram_messages_total', result='failed')
+        job.on_done(False)
+
+_dispatcher = None
+
+def get_dispatcher():
+    """Return the process-wide dispatcher, starting it on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = TelegramDispatcher().start()
+    return _dispatcher
+
+def shutdown_dispatcher(timeout=30):
+    """Flush and stop the process-wide dispatcher if it was started."""
+    global _dispatcher
+    if _dispatcher is not None:
+        _dispatcher.stop(timeout)
+        _dispatcher = None
@@ -0,0 +1,134 @@
+"""Course table parsing and fingerprinting."""
+import hashlib
+
+from lxml import etree
+
+from . import config
+from .retry import ParseError
+
+def find_course_table(page_html):
+    """Return (start, end) offsets of the course table in page_html, or None.
+
+    Works on the raw text, so it is far cheaper than building a parse tree.
+    Nested tables are skipped so `end` always points past the matching
+    closing tag.
+    """
+    marker = page_html.find(f'id="{config.COURSE_TABLE_ID}"')
+    if marker == -1:
+        return None
+    start = page_html.rfind('<table', 0, marker)
+    if start == -1:
+        return None
+
+    depth = 0
+    pos = start
+    while True:
+        next_open = page_html.find('<table', pos + 1)
+        next_close = page_html.find('</table>', pos + 1)
+        if next_close == -1:
+            return None
+        if next_open != -1 and next_open < next_close:
+            depth += 1
+            pos = next_open
+        elif depth:
+            depth -= 1
+            pos = next_close
+        else:
+            return start, next_close + len('</table>')
+
+def table_fingerprint(page_html):
+    """Hash the course table fragment of the page. Returns None if the table is missing."""
+    span = find_course_table(page_html)
+    if span is None:
+        return None
+    fragment = page_html[span[0]:span[1]]
+    return hashlib.blake2b(fragment.encode('utf-8'), digest_size=16).hexdigest()
+
+def extract_courses_bs4(page_html, trimesters=None):
+    """Parse page HTML with BeautifulSoup and return list of course dicts."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page_html, 'lxml')
+    # Look for the course table
+    table = soup.find('table', {'id': config.COURSE_TABLE_ID})
+
+    if not table:
+        raise ParseError("Course table not found on page")
+
+    rows = table.find_all('tr')
+    from bs4 import Tag
+
+    header_row = next((row for row in rows if isinstance(row, Tag) and row.find_all('th')), None)
+    if header_row is None:
+        raise ParseError("No header row found in table.")
+
+    headers = [th.get_text(strip=True) for th in header_row.find_all('th')]
+    course_data = []
+
+    for row in rows[1:]:
+        if isinstance(row, Tag):
+            cols = [td.get_text(strip=True) for td in row.find_all('td')]
+            if cols:
+                course_data.append(dict(zip(headers, cols)))
+
+    if trimesters is not None:
+        trimesters = set(trimesters)
+        course_data = [c for c in course_data if c.get('Trimester', '').strip() in trimesters]
+
+    return course_data
+
+def _cell_text(cell):
+    """Same result as BeautifulSoup's get_text(strip=True) for a table cell."""
+    return ''.join(text.strip() for text in cell.itertext())
+
+def extract_courses_lxml(page_html, trimesters=None):
+    """Parse only the course table with lxml and return list of course dicts.
+
+    The table fragment is cut out of the page by string search, so the
+    navigation, scripts and VIEWSTATE are never parsed. Returns exactly what
+    extract_courses_bs4() returns. With `trimesters`, rows for other
+    trimesters are dropped before their cells are read.
+    """
+    span = find_course_table(page_html)
+    if span is None:
+        # Unusual markup (e.g. single-quoted id); let BeautifulSoup decide
+        return extract_courses_bs4(page_html, trimesters)
+
+    root = etree.HTML(page_html[span[0]:span[1]])
+    table = root.find('.//table')
+    # BeautifulSoup leaves script/style text out of get_text()
+    etree.strip_elements(table, 'script', 'style', 'template', with_tail=False)
+
+    rows = list(table.iter('tr'))
+    header_row = next((row for row in rows if next(row.iter('th'), None) is not None), None)
+    if header_row is None:
+        raise ParseError("No header row found in table.")
+
+    headers = [_cell_text(th) for th in header_row.iter('th')]
+    trimester_index = headers.index('Trimester') if trimesters is not None and 'Trimester' in headers else None
+    if trimesters is not None:
+        trimesters = set(trimesters)
+    course_data = []
+
+    for row in rows[1:]:
+        cells = list(row.iter('td'))
+        if not cells:
+            continue
+        if trimester_index is not None:
+            if trimester_index >= len(cells) or _cell_text(cells[trimester_index]) not in trimesters:
+                continue
+        elif trimesters is not None:
+            # No Trimester column: nothing can match
+            continue
+        course_data.append(dict(zip(headers, [_cell_text(td) for td in cells])))
+
+    return course_data
+
+def extract_courses(page_html, trimesters=None):
+    """Parse page HTML and return list of course dicts using PARSER_BACKEND.
+
+    Pass `trimesters` (an iterable of trimester codes such as '243') to keep
+    only rows for those trimesters.
+    """
+    if config.PARSER_BACKEND == 'bs4':
+        return extract_courses_bs4(page_html, trimesters)
+    return extract_courses_lxml(page_html, trimesters)
@@ -0,0 +1,172 @@
+"""One poll of the course table: fetch, parse, diff and notify."""
+import time
+
+from . import metrics
+from .messages import get_message_for_course
+from .notify import get_dispatcher
+from .diff import (
+    GRADE_PUBLISHED, COURSE_ADDED, COURSE_DROPPED,
+    diff_courses, has_grade, index_courses,
+)
+from .parser import extract_courses, table_fingerprint
+from .portal import get_table_html
+from .retry import call_with_retries
+from .storage import save_account_state, save_course_changes
+
+def running_courses_in(course_data):
+    """Return the courses that have neither a grade nor a point yet."""
+    return [c for c in course_data if not c.get('Grade', '').strip() and not c.get('Point', '').strip()]
+
+def init_running_courses(account, state):
+    """On first run, fill state['running_courses'] with the courses that have no grade yet."""
+    print(f"[{account.user_id}] First run detected. Initializing running courses from UCAM...")
+    page_html = call_with_retries(get_table_html, account)
+    course_data = extract_courses(page_html)
+    state['running_courses'] = running_courses_in(course_data)
+    state['table_fingerprint'] = table_fingerprint(page_html)
+    print(f"[{account.user_id}] Found {len(state['running_courses'])} running courses.")
+    save_account_state(account, state)
+
+def refresh_running_courses(account, state):
+    """Look for courses to watch on an account that has none left, e.g. a new trimester.
+
+    Like a poll, an unchanged table is not parsed again. Otherwise only the
+    new running courses and the fingerprint are written. Returns the number
+    of running courses found.
+    """
+    account.stats['polls'] += 1
+    metrics.inc('ucam_polls_total')
+    page_html = call_with_retries(get_table_html, account)
+    fingerprint = table_fingerprint(page_html)
+    if fingerprint is not None and fingerprint == state.get('table_fingerprint'):
+        account.stats['fingerprint_hits'] += 1
+        return 0
+    account.stats['fingerprint_misses'] += 1
+
+    running_courses = running_courses_in(extract_courses(page_html))
+    with account.state_lock:
+        state['running_courses'] = running_courses
+        state['table_fingerprint'] = fingerprint
+        save_course_changes(account, running_courses, table_fingerprint=fingerprint)
+    if running_courses:
+        print(f"➕ [{account.user_id}] Found {len(running_courses)} new running courses.")
+    return len(running_courses)
+
+def poll_account(account, state):
+    """Fetch the course table once and queue notifications for newly published grades.
+
+    `state` is the dict returned by load_bot_state(). Notifications go
+    through the Telegram dispatcher, so this returns without waiting for
+    delivery; once a message is delivered the course moves from
+    running_courses to notified_courses and its document is updated. A
+    failed delivery is retried on the next poll. Only the courses that
+    changed are written. Returns the number of newly published grades found.
+
+    If the course table is byte-for-byte the one last processed, parsing and
+    diffing are skipped. The fingerprint is only remembered once no
+    notification is outstanding, so nothing is lost if the process stops
+    before delivery.
+    """
+    account.stats['polls'] += 1
+    metrics.inc('ucam_polls_total')
+    with metrics.timed('ucam_poll_seconds'):
+        return _poll(account, state)
+
+def _poll(account, state):
+    page_html = call_with_retries(get_table_html, account)
+    started = time.perf_counter()
+    fingerprint = table_fingerprint(page_html)
+    if fingerprint is not None and fingerprint == state.get('table_fingerprint'):
+        metrics.observe_phase('parse', time.perf_counter() - started)
+        account.stats['fingerprint_hits'] += 1
+        # Nothing to save, but lets write-behind flush changes that are due
+        with account.state_lock:
+            save_course_changes(account)
+        return 0
+    account.stats['fingerprint_misses'] += 1
+
+    with account.state_lock:
+        running_courses = state['running_courses']
+        notified_courses = state['notified_courses']
+
+        # Only rows from trimesters we are still waiting on can matter
+        trimesters = {c['Trimester'].strip() for c in running_courses}
+        course_data = extract_courses(page_html, trimesters)
+        metrics.observe_phase('parse', time.perf_counter() - started)
+
+        started = time.perf_counter()
+        published = []
+        tracked = []
+        dropped = []
+        # Only ungraded courses are kept, so a grade is reported once, when it is published
+        for event in diff_courses(index_courses(running_courses), index_courses(course_data)):
+            if event.key in account.pending_notifications or event.key in notified_courses:
+                continue
+            account.stats[event.kind] += 1
+
+            if event.kind == GRADE_PUBLISHED:
+                course = event.course
+                grade = course['Grade'].strip()
+                point = course['Point'].strip()
+                print(f"✅ [{account.user_id}] Result published for: {course['Course Name']} - Grade: {grade}, Point: {point}")
+                message = get_message_for_course(course, grade, float(point))
+                published.append((event.previous, event.key, message, course))
+            elif event.kind == COURSE_ADDED and not has_grade(event.course):
+                print(f"➕ [{account.user_id}] New course to watch: {event.course['Course Name']} ({event.course['Course ID']})")
+                running_courses.append(event.course)
+                tracked.append(event.course)
+            elif event.kind == COURSE_DROPPED:
+                print(f"➖ [{account.user_id}] Course no longer listed, stopped watching: {event.previous['Course Name']} ({event.previous['Course ID']})")
+                running_courses.remove(event.previous)
+                dropped.append(event.key)
+
+        if published:
+            account.pending_notifications.update(key for _, key, _, _ in published)
+        metrics.observe_phase('diff', time.perf_counter() - started)
+        new_fingerprint = None if account.pending_notifications else fingerprint
+        if new_fingerprint != state.get('table_fingerprint'):
+            state['table_fingerprint'] = new_fingerprint
+            save_course_changes(account, tracked, dropped=dropped, table_fingerprint=new_fingerprint)
+        else:
+            save_course_changes(account, tracked, dropped=dropped)
+
+    if published:
+        get_dispatcher().submit(
+            account.chat_id,
+            [message for _, _, message, _ in published],
+            on_done=lambda delivered: _notification_done(account, state, published, delivered, fingerprint)
+        )
+    return len(published)
+
+def _notification_done(account, state, published, delivered, fingerprint):
+    """Dispatcher callback: record the results that were delivered, release the rest for the next poll.
+
+    `delivered` holds one bool per entry of `published`. Once everything was
+    delivered and nothing else is pending, `fingerprint` (of the table the
+    results came from) is stored, so the next poll of an unchanged table
+    skips parsing.
+    """
+    with account.state_lock:
+        account.pending_notifications.difference_update(key for _, key, _, _ in published)
+        sent = [entry for entry, ok in zip(published, delivered) if ok]
+        if len(sent) < len(published):
+            print(f"❌ [{account.user_id}] {len(published) - len(sent)} of {len(published)} notifications failed. Will retry on the next poll.")
+        if not sent:
+            return
+        for saved_course, key, _, _ in sent:
+            state['notified_courses'].add(key)
+            if saved_course in state['running_courses']:
+                state['running_courses'].remove(saved_course)
+        account.stats['notifications'] += len(sent)
+        print(f"✅ [{account.user_id}] Notification sent.")
+        fields = {}
+        if fingerprint is not None and len(sent) == len(published) and not account.pending_notifications:
+            state['table_fingerprint'] = fields['table_fingerprint'] = fingerprint
+        save_course_changes(account, notified=[course for _, _, _, course in sent], **fields)
+
+def remember_publication(account, state, scheduler):
+    """Add a publication to the scheduler's history and store the history with the account's state."""
+    scheduler.record_publication()
+    with account.state_lock:
+        state['publication_hours'] = scheduler.history
+        save_course_changes(account, publication_hours=scheduler.history)
@@ -0,0 +1,246 @@
+"""HTTP access to the UCAM portal: login, session handling and page fetches."""
+import re
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from . import config
+from . import metrics
+from . import storage
+from .limiter import LimitedAdapter
+from .login import log_in
+from .parser import find_course_table
+from .retry import ParseError, call_with_retries
+
+def new_session(adapter=None):
+    """Create an HTTP session with its own cookie jar.
+
+    Passing a shared LimitedAdapter lets many sessions reuse one connection
+    pool while keeping their cookies separate. Either way every request goes
+    through the host-wide politeness limiter.
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': config.USER_AGENT})
+    adapter = adapter or LimitedAdapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class UcamAccount:
+    """One student being watched: credentials, cookie jar and mmi value."""
+
+    def __init__(self, user_id, password, chat_id=None, session=None, state_id=None):
+        self.user_id = user_id
+        self.password = password
+        self.chat_id = chat_id or config.TELEGRAM_CHAT_ID
+        self.session = session or new_session()
+        # Menu Mapping Identifier, extracted after login
+        self.mmi = None
+        # Set by login_ucam(); cleared when a response shows the session expired
+        self.logged_in = False
+        # time.time() of the last response that proved the session works
+        self.last_validated = None
+        # Key of this account's state and saved session in the store
+        self.state_id = state_id or f'state:{user_id}'
+        # Guards the state dict shared with the Telegram dispatcher callbacks
+        self.state_lock = threading.Lock()
+        # course_key()s handed to the dispatcher but not yet delivered
+        self.pending_notifications = set()
+        # Per-process counters for the poll log
+        self.stats = Counter()
+        # Every HTTP response, redirect hops included, is one round-trip to UCAM
+        self.session.hooks['response'].append(self._count_round_trip)
+
+    def _count_round_trip(self, response, *args, **kwargs):
+        self.stats['round_trips'] += 1
+
+    def __repr__(self):
+        return f'UcamAccount({self.user_id!r})'
+
+def login_once(account):
+    """Log in to UCAM once: a GET of the login form and a POST (see ucam_bot.login), or in Chrome with FETCH_ENGINE=selenium.
+
+    Raises AuthError if UCAM does not accept the credentials, and lets
+    network errors and 5xx responses through for call_with_retries() to classify.
+    """
+    account.logged_in = False
+    try:
+        with metrics.phase('login'):
+            if config.FETCH_ENGINE == 'selenium':
+                from .browser import log_in_browser
+                mmi = log_in_browser(account)
+            else:
+                mmi = log_in(account.session, account.user_id, account.password)
+    except Exception:
+        metrics.inc('ucam_logins_total', result='failed')
+        raise
+    metrics.inc('ucam_logins_total', result='ok')
+    if mmi:
+        account.mmi = mmi
+        print(f"✅ [{account.user_id}] Extracted mmi parameter: {account.mmi}")
+    print(f"✅ [{account.user_id}] Login successful!")
+    account.logged_in = True
+    account.stats['logins'] += 1
+    return True
+
+def login_ucam(account, max_retries=3):
+    """Attempts to log in to UCAM with retries on failure using HTTP requests. Returns False if it fails."""
+    try:
+        return call_with_retries(login_once, account, budget=max_retries - 1)
+    except Exception as e:
+        print(f"[{account.user_id}] Login failed: {e}")
+        return False
+
+def course_history_url(account):
+    """Return the StudentCourseHistory.aspx URL, with the account's mmi if known."""
+    url = f'{config.BASE_URL}/Student/StudentCourseHistory.aspx'
+    if account.mmi:
+        url += f'?mmi={account.mmi}'
+    return url
+
+def session_expired(response):
+    """True if UCAM answered with the login page or a 404 instead of the requested page."""
+    return response.status_code == 404 or 'login' in response.url.lower()
+
+def is_session_valid(account):
+    """Check if current session is still valid by attempting a request.
+
+    This costs a full page fetch; the poll path detects expiry from the page
+    it already downloaded instead (see get_table_html).
+    """
+    try:
+        with metrics.phase('session_check'):
+            response = account.session.get(course_history_url(account), timeout=10, allow_redirects=True)
+        if session_expired(response):
+            return False
+        return response.status_code == 200
+    except Exception:
+        return False
+
+def relogin(account):
+    """Log in again with a single attempt, raising if it fails.
+
+    Retrying is left to the caller's call_with_retries(), so one poll cannot
+    turn into several rounds of logins.
+    """
+    print(f"🔄 [{account.user_id}] Session expired or invalid. Re-logging in...")
+    login_once(account)
+    print(f"✅ [{account.user_id}] Re-login successful!")
+    storage.save_session(account)
+
+def fetch_course_page(account):
+    """GET the course history page once. Returns its HTML, or None if the session has expired."""
+    if config.FETCH_ENGINE == 'selenium':
+        from .browser import fetch_course_page_browser
+        return fetch_course_page_browser(account, course_history_url(account))
+
+    # Navigate to the course history page with mmi parameter if available
+    streaming = config.FETCH_MODE == 'stream'
+    response = account.session.get(course_history_url(account), timeout=10, allow_redirects=True, stream=streaming)
+    try:
+        if session_expired(response):
+            return None
+        response.raise_for_status()
+        if not streaming:
+            account.stats['bytes_received'] += len(response.content)
+            page_html = response.text
+        else:
+            page_html = read_until_table_end(response, account)
+    finally:
+        response.close()
+
+    # A 200 without the course table is UCAM's way of showing a stale session too
+    if config.COURSE_TABLE_ID not in page_html:
+        return None
+    account.last_validated = time.time()
+    return page_html
+
+def get_table_html(account, force_fresh=False):
+    """Fetch the course history page and extract table HTML.
+
+    A healthy poll is a single request. Expiry is detected from that
+    response (redirect to Login.aspx, 404 or no course table), in which case
+    the account logs in again and the fetch is retried once.
+    """
+    try:
+        if force_fresh or not account.logged_in:
+            relogin(account)
+
+        with metrics.phase('fetch'):
+            page_html = fetch_course_page(account)
+        if page_html is None:
+            account.logged_in = False
+            account.stats['session_expiries'] += 1
+            metrics.inc('ucam_session_expiries_total')
+            relogin(account)
+            with metrics.phase('fetch'):
+                page_html = fetch_course_page(account)
+            if page_html is None:
+                raise ParseError("Course table missing even after re-login")
+        return page_html
+    except Exception as e:
+        print(f"[{account.user_id}] Failed to fetch course page: {e}")
+        raise
+
+def declared_charset(response, head):
+    """Return the charset from the Content-Type header or a <meta> tag in `head`, else utf-8."""
+    content_type = response.headers.get('Content-Type', '')
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type, re.I)
+    if not match:
+        match = re.search(rb'<meta[^>]+charset=["\']?([\w.:-]+)', head, re.I)
+        if match:
+            return match.group(1).decode('ascii')
+        return 'utf-8'
+    return match.group(1)
+
+def read_until_table_end(response, account):
+    """Read a streamed course page until the course table is closed.
+
+    Returns the page decoded up to and including the table, using the
+    declared charset instead of requests' character detection. If the table
+    never closes the whole body is returned, so the parser reports it.
+    """
+    marker = f'id="{config.COURSE_TABLE_ID}"'.encode('ascii')
+    buf = bytearray()
+    table_start = -1
+    charset = None
+    text = None
+
+    for chunk in response.iter_content(config.STREAM_CHUNK_SIZE):
+        scan_from = max(0, len(buf) - len(b'</table>'))
+        buf += chunk
+        if table_start == -1:
+            table_start = buf.find(marker, max(0, scan_from - len(marker)))
+            if table_start == -1:
+                continue
+            charset = declared_charset(response, bytes(buf[:table_start]))
+        if buf.find(b'</table>', max(table_start, scan_from)) == -1:
+            continue
+        text = buf.decode(charset, errors='replace')
+        if find_course_table(text) is not None:
+            break
+        text = None
+    else:
+        account.stats['stream_full_reads'] += 1
+
+    # A short tail is cheaper to drain than a new TLS handshake on the next poll
+    remaining = int(response.headers.get('Content-Length', -1)) - response.raw.tell()
+    if text is not None and 0 < remaining <= config.STREAM_DRAIN_LIMIT:
+        for _ in response.iter_content(config.STREAM_CHUNK_SIZE):
+            pass
+    account.stats['bytes_received'] += response.raw.tell()
+
+    if text is None:
+        text = buf.decode(charset or declared_charset(response, bytes(buf[:4096])), errors='replace')
+    return text
+
+def start_session(account):
+    """Reuse the saved session if there is one, otherwise log in. Returns False if login fails."""
+    if storage.restore_session(account):
+        return True
+    if not login_ucam(account):
+        return False
+    storage.save_session(account)
+    return True
@@ -0,0 +1,270 @@
+"""Profile poll cycles: where the CPU time and the memory go.
+
+profile_polls() runs poll_account() `polls` times in two passes and writes
+to `output_dir`:
+
+    hotspots.txt      top functions by own and cumulative time (cProfile)
+    stacks.folded     wall-clock stacks of the polling and Telegram threads, sampled
+                      every millisecond, one "a;b;c count" line per stack, for
+                      flamegraph.pl, speedscope or inferno
+    allocations.txt   allocation sites holding the most memory at the poll peak, and
+                      what is still held after the last poll compared to the first (tracemalloc)
+    profile.pstats    the raw cProfile data, for snakeviz or pstats
+    summary.json      per-poll times, peak and retained memory and the top sites, to
+                      compare runs across releases
+
+The first pass runs cProfile and the stack sampler, the second tracemalloc,
+so tracemalloc's overhead does not show up in the timings. With full_parse
+the table fingerprint is cleared before every poll, so each poll parses and
+diffs the table instead of stopping at the fingerprint check.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from . import notify
+from .poll import poll_account
+
+SAMPLE_INTERVAL_SECONDS = 0.001
+MEMORY_SAMPLE_INTERVAL_SECONDS = 0.005
+TRACEMALLOC_FRAMES = 10
+
+def _frame_label(code):
+    """'function (package/module.py:line)' with the path shortened to its last two parts."""
+    path = code.co_filename.replace('\\', '/').rsplit('/', 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Counts the stacks of some threads every `interval` seconds, for a flame graph.
+
+    `roots` maps the ident of each thread to sample to the code object its
+    stacks start at. A thread is only sampled while inside its root, so the
+    profiler's own frames stay out. Samples where a thread sits idle in a
+    threading wait are left out too, so the Telegram worker only shows up
+    while it is delivering.
+    """
+
+    def __init__(self, roots, interval=SAMPLE_INTERVAL_SECONDS):
+        self.roots = roots
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident not in self.roots:
+                    continue
+                if frame.f_code.co_name == 'wait' and frame.f_code.co_filename == threading.__file__:
+                    continue
+                root = self.roots.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    if frame.f_code is root:
+                        break
+                    frame = frame.f_back
+                if frame is None:
+                    continue
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+class PeakSnapshot:
+    """Keeps the tracemalloc snapshot taken when the most memory was traced."""
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.snapshot = None
+        self.size = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sample()
+
+    def sample(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size > self.size:
+            self.size = size
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+def _poll_threads():
+    """Roots for StackSampler: this thread from poll_account(), the Telegram worker from its loop."""
+    roots = {threading.get_ident(): poll_account.__code__}
+    dispatcher = notify.get_dispatcher()
+    if dispatcher._thread is not None:
+        roots[dispatcher._thread.ident] = notify.TelegramDispatcher._run.__code__
+    return roots
+
+def _run_polls(account, state, polls, full_parse, before_poll, around=None):
+    """Poll `polls` times. Returns the wall time of each poll in seconds."""
+    times = []
+    for i in range(polls):
+        if before_poll is not None:
+            before_poll(i)
+        if full_parse:
+            state['table_fingerprint'] = None
+        started = time.perf_counter()
+        if around is not None:
+            around(lambda: poll_account(account, state))
+        else:
+            poll_account(account, state)
+        times.append(time.perf_counter() - started)
+    # Deliveries queued by the last polls belong to this run
+    notify.get_dispatcher().flush(30)
+    return times
+
+def _filtered(snapshot):
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+
+def _site(stat):
+    frame = stat.traceback[0]
+    return f"{'/'.join(frame.filename.replace(chr(92), '/').rsplit('/', 2)[-2:])}:{frame.lineno}"
+
+def profile_polls(account, state, polls, output_dir, full_parse=True, before_poll=None, top=30):
+    """Profile `polls` calls of poll_account(account, state) and write the reports to output_dir.
+
+    before_poll(i), if given, runs before poll i outside the measurements.
+    Returns the summary written to summary.json.
+    """
+    if polls < 1:
+        raise ValueError(f"need at least one poll to profile, got {polls}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Pass 1: CPU time and stacks
+    profiler = cProfile.Profile()
+    sampler = StackSampler(_poll_threads()).start()
+
+    def profiled(poll):
+        profiler.enable()
+        try:
+            poll()
+        finally:
+            profiler.disable()
+
+    try:
+        times = _run_polls(account, state, polls, full_parse, before_poll, profiled)
+    finally:
+        sampler.stop()
+    profiler.dump_stats(os.path.join(output_dir, 'profile.pstats'))
+    stats = pstats.Stats(profiler)
+    report = io.StringIO()
+    stats.stream = report
+    report.write(f"{polls} polls, {statistics.median(times) * 1000:.1f} ms median under cProfile\n\n")
+    stats.sort_stats('tottime').print_stats(top)
+    stats.sort_stats('cumulative').print_stats(top)
+    with open(os.path.join(output_dir, 'hotspots.txt'), 'w', encoding='utf-8') as f:
+        f.write(report.getvalue())
+    with open(os.path.join(output_dir, 'stacks.folded'), 'w', encoding='utf-8') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f'{stack} {count}\n')
+
+    # Pass 2: memory
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    baseline = tracemalloc.take_snapshot()
+    peak = PeakSnapshot().start()
+    retained = []
+    first = None
+
+    def traced(poll):
+        nonlocal first
+        tracemalloc.reset_peak()
+        poll()
+        retained.append(tracemalloc.get_traced_memory())
+        if first is None:
+            first = tracemalloc.take_snapshot()
+
+    try:
+        _run_polls(account, state, polls, full_parse, before_poll, traced)
+    finally:
+        peak.stop()
+    last = tracemalloc.take_snapshot()
+    if not tracing:
+        tracemalloc.stop()
+
+    at_peak = _filtered(peak.snapshot).compare_to(_filtered(baseline), 'lineno') if peak.snapshot else []
+    growth = _filtered(last).compare_to(_filtered(first), 'lineno')
+    with open(os.path.join(output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+        f.write(f"Peak: {peak.size / 1024:.1f} KB traced while polling\n")
+        for stat in at_peak[:top]:
+            f.write(f"  {stat}\n")
+        f.write(f"\nHeld after poll {polls} compared to after poll 1 "
+                f"({(retained[-1][0] - retained[0][0]) / 1024:+.1f} KB)\n")
+        for stat in growth[:top]:
+            f.write(f"  {stat}\n")
+        if at_peak:
+            f.write("\nLargest site at the peak, full traceback:\n")
+            f.write('\n'.join(at_peak[0].traceback.format()) + '\n')
+
+    summary = {
+        'polls': polls,
+        'full_parse': full_parse,
+        'poll_median_ms': statistics.median(times) * 1000,
+        'poll_min_ms': min(times) * 1000,
+        'poll_max_ms': max(times) * 1000,
+        'stack_samples': sampler.samples,
+        'peak_kb_per_poll': max(peak_size for _, peak_size in retained) / 1024,
+        'retained_growth_kb': (retained[-1][0] - retained[0][0]) / 1024,
+        'functions': [
+            {'function': f"{name} ({'/'.join(path.replace(chr(92), '/').rsplit('/', 2)[-2:])}:{line})",
+             'own_ms_per_poll': own * 1000 / polls, 'cumulative_ms_per_poll': cumulative * 1000 / polls, 'calls': calls}
+            for (path, line, name), (_, calls, own, cumulative, _) in
+            sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        ],
+        'allocations_at_peak': [{'site': _site(stat), 'kb': stat.size_diff / 1024, 'blocks': stat.count_diff}
+                                for stat in at_peak[:top]],
+        'retained_growth': [{'site': _site(stat), 'kb': stat.size_diff / 1024, 'blocks': stat.count_diff}
+                            for stat in growth[:top] if stat.size_diff],
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+def print_profile_summary(summary, output_dir):
+    print(f"🔬 Profiled {summary['polls']} polls: {summary['poll_median_ms']:.1f} ms median under cProfile, "
+          f"{summary['peak_kb_per_poll']:.0f} KB peak allocation per poll, "
+          f"{summary['retained_growth_kb']:+.1f} KB retained over the run")
+    for entry in summary['functions'][:5]:
+        print(f"   {entry['own_ms_per_poll']:8.2f} ms/poll  {entry['function']}")
+    print(f"   Reports in {output_dir}/: hotspots.txt, stacks.folded, allocations.txt, profile.pstats, summary.json")
@@ -0,0 +1,202 @@
+"""Retries and a circuit breaker for requests to UCAM.
+
+Failures are sorted into classes, each with its own retry allowance:
+
+    timeout   network errors, timeouts, no free slot  retried, counts towards the breaker
+    server    HTTP 5xx                                retried, counts towards the breaker
+    auth      login rejected or session unusable      retried once
+    parse     course table missing or unreadable      retried once
+    other     anything else                           not retried
+
+Retries wait an exponentially growing, jittered delay, and one call (one
+poll) may spend at most RETRY_BUDGET retries in total. The circuit breaker
+counts timeout and server failures in a row across every account. After
+BREAKER_FAILURE_THRESHOLD of them it opens, and calls fail at once without
+touching UCAM. Once BREAKER_COOLDOWN_SECONDS have passed, one trial call is
+let through. Success closes the breaker; failure opens it again with twice
+the cooldown.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from . import config
+from . import metrics
+from .limiter import QueueTimeout
+
+TIMEOUT = 'timeout'
+SERVER = 'server'
+AUTH = 'auth'
+PARSE = 'parse'
+OTHER = 'other'
+
+# Retries allowed per failure class within one call
+MAX_RETRIES = {TIMEOUT: 3, SERVER: 3, AUTH: 1, PARSE: 1, OTHER: 0}
+# Failures that mean UCAM itself is unwell
+BREAKER_CLASSES = {TIMEOUT, SERVER}
+
+class AuthError(Exception):
+    """UCAM rejected the login, or a fresh session still could not be used."""
+
+class ParseError(ValueError):
+    """The course table was missing from the page or could not be read."""
+
+class CircuitOpenError(Exception):
+    """UCAM is being left alone after repeated failures."""
+
+def classify(error):
+    """Return the failure class of an exception."""
+    if isinstance(error, AuthError):
+        return AUTH
+    if isinstance(error, ParseError):
+        return PARSE
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, QueueTimeout)):
+        return TIMEOUT
+    if isinstance(error, requests.HTTPError) and error.response is not None and error.response.status_code >= 500:
+        return SERVER
+    return OTHER
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Delay before retry number `attempt` (1-based): base * 2**(attempt-1), capped, with jitter over its upper half."""
+    base = config.RETRY_BASE_DELAY_SECONDS if base is None else base
+    cap = config.RETRY_MAX_DELAY_SECONDS if cap is None else cap
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class CircuitBreaker:
+    """Stops calls to a failing service for a while. States: closed, open, half_open."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, threshold=None, cooldown=None, max_cooldown=None):
+        self.name = name
+        self.threshold = threshold or config.BREAKER_FAILURE_THRESHOLD
+        self.base_cooldown = cooldown or config.BREAKER_COOLDOWN_SECONDS
+        self.max_cooldown = max_cooldown or config.BREAKER_MAX_COOLDOWN_SECONDS
+        self.cooldown = self.base_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.stats = Counter()
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        self.state = state
+        self.stats[state] += 1
+        metrics.set_gauge('ucam_circuit_open', int(state != self.CLOSED), circuit=self.name)
+        if state == self.OPEN:
+            print(f"🔌 {self.name} circuit opened after {self.failures} failures. No requests for {self.cooldown:.0f}s.")
+        elif state == self.HALF_OPEN:
+            print(f"🔌 {self.name} circuit half-open. Sending one trial request.")
+        else:
+            print(f"🔌 {self.name} circuit closed. Requests resume.")
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    self.stats['short_circuited'] += 1
+                    raise CircuitOpenError(f"{self.name} circuit open, next trial in {remaining:.0f}s")
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    self.stats['short_circuited'] += 1
+                    raise CircuitOpenError(f"{self.name} circuit half-open, waiting for the trial request")
+                self._trial_running = True
+
+    def record(self, failure_class=None):
+        """Record how a call ended: None for success, otherwise its failure class."""
+        with self._lock:
+            self._trial_running = False
+            if failure_class in BREAKER_CLASSES:
+                self.failures += 1
+                if self.state == self.HALF_OPEN:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                    self.opened_at = time.monotonic()
+                    self._set_state(self.OPEN)
+                elif self.state == self.CLOSED and self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+                    self._set_state(self.OPEN)
+            elif failure_class in (None, AUTH, PARSE):
+                # UCAM answered, so it is up even if the answer was not what we wanted
+                self.failures = 0
+                if self.state != self.CLOSED:
+                    self.cooldown = self.base_cooldown
+                    self._set_state(self.CLOSED)
+
+_breaker = None
+# Failures by class, retries, exhausted budgets
+retry_stats = Counter()
+
+def ucam_breaker():
+    """Return the process-wide circuit breaker for UCAM."""
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker('UCAM')
+    return _breaker
+
+def call_with_retries(task_fn, *args, budget=None, breaker=None, **kwargs):
+    """Call task_fn(*args, **kwargs), retrying failures according to their class.
+
+    At most `budget` retries (default RETRY_BUDGET) are spent in total. Every
+    attempt first asks the circuit breaker, so nothing is sent while it is open.
+    """
+    breaker = breaker or ucam_breaker()
+    budget = config.RETRY_BUDGET if budget is None else budget
+    failures = Counter()
+    while True:
+        breaker.before_call()
+        try:
+            result = task_fn(*args, **kwargs)
+        except Exception as e:
+            failure_class = classify(e)
+            breaker.record(failure_class)
+            retry_stats[failure_class] += 1
+            metrics.inc('ucam_failures_total', kind=failure_class)
+            failures[failure_class] += 1
+            if failures[failure_class] > MAX_RETRIES[failure_class]:
+                raise
+            if budget <= 0:
+                retry_stats['budget_exhausted'] += 1
+                raise
+            budget -= 1
+            retry_stats['retries'] += 1
+            metrics.inc('ucam_retries_total', kind=failure_class)
+            delay = backoff_delay(sum(failures.values()))
+            print(f"Attempt {sum(failures.values())} failed ({failure_class}): {e}. Retrying in {delay:.1f}s.")
+            time.sleep(delay)
+            continue
+        breaker.record(None)
+        return result
+
+def with_retries(task_fn, max_retries=3, delay=2, *args, **kwargs):
+    """Generic retry helper for any task.
+
+    Kept for the Selenium scripts: retries any exception except an AuthError,
+    waiting `delay` seconds doubled per attempt with jitter.
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            return task_fn(*args, **kwargs)
+        except Exception as e:
+            print(f"Attempt {attempt} failed: {e}")
+            if attempt == max_retries or isinstance(e, AuthError):
+                raise
+            time.sleep(backoff_delay(attempt, base=delay, cap=delay * 8))
+
+def print_retry_report():
+    """Print failure classes, retries and the circuit breaker state."""
+    breaker = ucam_breaker()
+    failures = ', '.join(f"{retry_stats[name]} {name}" for name in (TIMEOUT, SERVER, AUTH, PARSE, OTHER) if retry_stats[name])
+    print(f"🔁 {retry_stats['retries']} retries ({failures or 'no failures'}) | "
+          f"{retry_stats['budget_exhausted']} polls out of retry budget | "
+          f"circuit {breaker.state}, opened {breaker.stats[CircuitBreaker.OPEN]} times, "
+          f"{breaker.stats['short_circuited']} calls skipped")
@@ -0,0 +1,217 @@
+"""When to poll UCAM next.
+
+Results tend to appear in the same few hours of the day, so PollScheduler
+keeps a per-hour count of when publications were detected (Dhaka time) and
+polls often in those hours and rarely outside them. Until there is enough
+history, POLL_ACTIVE_HOURS are polled every POLL_INTERVAL_SECONDS and the
+other hours every POLL_MAX_INTERVAL_SECONDS. Delays are jittered so bots
+started together drift apart, and failed polls back off exponentially.
+
+AccountQueue and fleet_delay() order many accounts in one process so that
+polls go to the accounts most likely to have news.
+"""
+import heapq
+import itertools
+import random
+import time
+from collections import Counter, deque
+
+from . import config
+from . import metrics
+
+HOURS = 24
+# UCAM publishes on Bangladesh time
+UTC_OFFSET_SECONDS = 6 * 3600
+# Each new publication shrinks the older history by this factor, so the schedule follows changing habits
+HISTORY_DECAY = 0.95
+# A student typically waits on this many courses; fleet_delay() scales around it
+PENDING_REFERENCE = 4
+
+def parse_hours(spec):
+    """Turn '8-23' or '9-13,15-23' into a set of hours. Ranges end before the second hour and may wrap midnight."""
+    hours = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        start = int(start) % HOURS
+        end = (int(end) if end else start + 1) % HOURS
+        hour = start
+        while True:
+            hours.add(hour)
+            hour = (hour + 1) % HOURS
+            if hour == end:
+                break
+    return hours
+
+def hour_of_day(now):
+    return int((now + UTC_OFFSET_SECONDS) // 3600) % HOURS
+
+class PollScheduler:
+    """Decides the delay before the next poll of one account."""
+
+    def __init__(self, history=None, adaptive=True, base_interval=None, min_interval=None,
+                 max_interval=None, active_hours=None, jitter=None, rng=None):
+        self.history = list(history) if history else [0.0] * HOURS
+        self.adaptive = adaptive
+        self.base_interval = base_interval or config.POLL_INTERVAL_SECONDS
+        self.min_interval = min(min_interval or config.POLL_MIN_INTERVAL_SECONDS, self.base_interval)
+        self.max_interval = max(max_interval or config.POLL_MAX_INTERVAL_SECONDS, self.base_interval)
+        self.active_hours = parse_hours(config.POLL_ACTIVE_HOURS if active_hours is None else active_hours)
+        self.jitter = config.POLL_JITTER if jitter is None else jitter
+        self.rng = rng or random.Random()
+        # Failed polls in a row
+        self.failures = 0
+        self.stats = Counter()
+
+    def hour_weight(self, hour):
+        """How likely results are in `hour`, from 0 (never) to 1 (the busiest hour).
+
+        Starts at 0.5 for active hours and 0 for the rest, and moves towards the
+        recorded history as publications are seen. Each hour also counts half of
+        its neighbours, since a release at 14:58 says 15:00 is busy too.
+        """
+        prior = 0.5 if hour in self.active_hours else 0.0
+        total = sum(self.history)
+        if not total:
+            return prior
+        smoothed = [
+            self.history[h] + 0.5 * (self.history[h - 1] + self.history[(h + 1) % HOURS])
+            for h in range(HOURS)
+        ]
+        learned = smoothed[hour] / max(smoothed)
+        confidence = total / (total + config.POLL_HISTORY_WEIGHT)
+        return prior * (1 - confidence) + learned * confidence
+
+    def interval_for(self, hour):
+        """Poll interval for `hour` before jitter.
+
+        Weight 0 polls every max_interval, 0.5 every base_interval and 1 every
+        min_interval, interpolated geometrically in between.
+        """
+        if not self.adaptive:
+            return self.base_interval
+        weight = self.hour_weight(hour)
+        if weight <= 0.5:
+            return self.max_interval * (self.base_interval / self.max_interval) ** (2 * weight)
+        return self.base_interval * (self.min_interval / self.base_interval) ** (2 * weight - 1)
+
+    def next_delay(self, now=None):
+        """Seconds to wait before the next poll."""
+        now = time.time() if now is None else now
+        if self.failures:
+            backoff = min(config.POLL_ERROR_BACKOFF_SECONDS * 2 ** (self.failures - 1), config.POLL_MAX_BACKOFF_SECONDS)
+            self.stats['backoff_seconds'] += backoff
+            # Somewhere between half and all of the backoff, so retries after an outage are spread out
+            return backoff * self.rng.uniform(0.5, 1.0)
+
+        delay = self.interval_for(hour_of_day(now)) * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        # Look again at the top of the hour in case the next one is busier
+        until_next_hour = 3600 - (now + UTC_OFFSET_SECONDS) % 3600
+        if delay > until_next_hour:
+            delay = until_next_hour + self.rng.uniform(0, self.min_interval)
+        return delay
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.stats['failures'] += 1
+
+    def record_publication(self, now=None):
+        """Remember that results were found at `now`."""
+        now = time.time() if now is None else now
+        self.history = [count * HISTORY_DECAY for count in self.history]
+        self.history[hour_of_day(now)] += 1
+        self.stats['publications'] += 1
+
+def fleet_delay(scheduler, pending_courses, last_published_at=None, now=None):
+    """Delay before polling one of many watched accounts again.
+
+    Accounts with no courses left are checked for new ones every
+    IDLE_CHECK_INTERVAL_SECONDS. An account that just had results published
+    is polled at the scheduler's shortest interval for a while, since the
+    rest of the trimester often follows. Otherwise the scheduler's time-of-day
+    delay is shortened for accounts waiting on many courses and stretched for
+    accounts waiting on few.
+    """
+    now = time.time() if now is None else now
+    spread = scheduler.rng.uniform(1 - scheduler.jitter, 1 + scheduler.jitter)
+    if scheduler.failures:
+        return scheduler.next_delay(now)
+    if not pending_courses:
+        return config.IDLE_CHECK_INTERVAL_SECONDS * spread
+    if last_published_at is not None and now - last_published_at < config.RECENT_PUBLICATION_SECONDS:
+        return scheduler.min_interval * spread
+    scale = min(max((PENDING_REFERENCE / pending_courses) ** 0.5, 0.5), 2.0)
+    return min(max(scheduler.next_delay(now) * scale, scheduler.min_interval), scheduler.max_interval)
+
+class AccountQueue:
+    """Min-heap of watched accounts ordered by when each is next due.
+
+    Rescheduling pushes a new entry and leaves the old one in the heap; stale
+    entries are skipped when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._sequence = itertools.count()
+        self.stats = Counter()
+        # Seconds between when an account was due and when a poll slot was free for it
+        self.lag = deque(maxlen=1000)
+        self.started = time.monotonic()
+
+    def __len__(self):
+        return len(self._due)
+
+    def push(self, key, due):
+        """Schedule `key` at `due` (time.time()), replacing any earlier entry."""
+        entry = (due, next(self._sequence), key)
+        self._due[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def expedite(self, key, due):
+        """Move `key` forward to `due` if it is currently scheduled later. Returns True if it moved."""
+        entry = self._due.get(key)
+        if entry is None or entry[0] <= due:
+            return False
+        self.push(key, due)
+        self.stats['expedited'] += 1
+        metrics.inc('ucam_queue_expedited_total')
+        return True
+
+    def next_due(self):
+        """Due time of the first live entry, or None if the queue is empty."""
+        while self._heap and self._due.get(self._heap[0][2]) is not self._heap[0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop(self, now=None):
+        """Remove and return the first key if it is due, else None."""
+        now = time.time() if now is None else now
+        due = self.next_due()
+        if due is None or due > now:
+            return None
+        _, _, key = heapq.heappop(self._heap)
+        del self._due[key]
+        self.lag.append(now - due)
+        self.stats['dispatched'] += 1
+        metrics.inc('ucam_queue_dispatched_total')
+        return key
+
+    def metrics(self):
+        """Throughput and queue-lag figures for logs and the metrics endpoint."""
+        lags = sorted(self.lag)
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            'dispatched': self.stats['dispatched'],
+            'expedited': self.stats['expedited'],
+            'polls_per_minute': self.stats['dispatched'] * 60 / elapsed,
+            'lag_p50_seconds': lags[len(lags) // 2] if lags else 0.0,
+            'lag_p95_seconds': lags[int(len(lags) * 0.95)] if lags else 0.0,
+            'lag_max_seconds': lags[-1] if lags else 0.0,
+            'queued': len(self),
+        }
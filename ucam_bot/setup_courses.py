@@ -0,0 +1,118 @@
+"""Record this trimester's running courses before the bot's first run.
+
+Logs in and reads the course table exactly as bot_v2.py does (over HTTP,
+or in headless Chrome with --selenium), then writes the courses that have
+no grade yet straight into the STATE_BACKEND store under the single-account
+bot's state, so the first poll already knows what to watch. Running it again
+replaces the list of running courses; courses already notified are kept.
+With --json, or when running_courses.json already exists, the list is also
+written there as the plain list bot_v0.py reads.
+
+Usage:
+    python setup_running_courses.py [--json running_courses.json] [--selenium]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import config
+from . import storage
+from .browser import close_browser, print_browser_report
+from .diff import index_courses
+from .parser import extract_courses, table_fingerprint
+from .poll import running_courses_in
+from .portal import UcamAccount, get_table_html, start_session
+from .retry import call_with_retries
+
+# The file bot_v0.py reads its running courses from
+BOT_V0_FILE = 'running_courses.json'
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Store the running courses of the current trimester for the bot.")
+    parser.add_argument('--json', metavar='FILE',
+                        help=f"also write the running courses to FILE, as bot_v0.py expects (default: {BOT_V0_FILE} "
+                             f"if it already exists)")
+    parser.add_argument('--selenium', action='store_true',
+                        help="use the Selenium engine (headless Chrome) instead of HTTP, same as FETCH_ENGINE=selenium")
+    return parser.parse_args(argv)
+
+def fetch_page(account):
+    """Return HTML containing the course table, with whichever FETCH_ENGINE is configured."""
+    if not start_session(account):
+        hint = "" if config.FETCH_ENGINE == 'selenium' else " If UCAM changed its login page, try --selenium."
+        raise Exception(f"Login failed.{hint}")
+    page_html = call_with_retries(get_table_html, account)
+    storage.save_session(account)
+    return page_html
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where the resource module is missing."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.json is None and os.path.exists(BOT_V0_FILE):
+        # Set up for bot_v0.py before; keep its file current
+        args.json = BOT_V0_FILE
+    started = time.perf_counter()
+    if args.selenium:
+        config.FETCH_ENGINE = 'selenium'
+
+    if not config.USER_ID or not config.PASSWORD:
+        print("ERROR: USER_ID and PASSWORD not found in environment variables.")
+        sys.exit(1)
+
+    print("Setting up running courses for the current trimester...")
+    if not storage.check_store():
+        sys.exit(1)
+
+    # Same state document as bot_v2.py
+    account = UcamAccount(config.USER_ID, config.PASSWORD, state_id='state')
+    exit_code = 0
+    try:
+        page_html = fetch_page(account)
+        running_courses = running_courses_in(extract_courses(page_html))
+
+        print(f"Found {len(running_courses)} running courses:")
+        for course in running_courses:
+            print(f"  - {course['Course ID'].strip()}: {course['Course Name'].strip()}")
+
+        state = storage.load_bot_state(account.state_id)
+        current = index_courses(running_courses)
+        dropped = [key for key in index_courses(state['running_courses']) if key not in current]
+        storage.save_course_changes(
+            account, running_courses, dropped=dropped,
+            # A table read by Chrome is not byte-for-byte what the HTTP poll sees
+            table_fingerprint=None if config.FETCH_ENGINE == 'selenium' else table_fingerprint(page_html)
+        )
+        storage.flush_state_writes()
+        print(f"Running courses saved to the {config.STATE_BACKEND} store.")
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(running_courses, f, ensure_ascii=False, indent=2)
+            print(f"Running courses saved to {args.json}")
+        print("Setup complete! You can now run the bot to monitor for result publications.")
+    except Exception as e:
+        print(f"Error during setup: {e}")
+        exit_code = 1
+    finally:
+        storage.close_store()
+        print_browser_report()
+        close_browser()
+
+    peak = peak_memory_mb()
+    print(f"⏱️ Setup took {time.perf_counter() - started:.1f}s"
+          + (f", peak memory {peak:.0f} MB" if peak is not None else ""))
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Persistence for bot state and saved UCAM sessions.
+
+Bot state is one small document per course in the `courses` collection,
+plus a `bot_state` document per account holding the table fingerprint.
+Changes are sent as bulk writes, optionally held back for
+STATE_WRITE_BEHIND_SECONDS so several polls share one write.
+
+STATE_BACKEND picks where the documents live (see backends.py). Nothing
+connects at import time. For MongoDB, open_store() starts the handshake on
+a background thread so the UCAM login can run at the same time; the first
+read or write waits for it.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from . import config
+from . import metrics
+from .backends import open_backend
+from .diff import course_key, normalize_key
+
+# Columns kept in each per-course document
+COURSE_FIELDS = ('Course ID', 'Course Name', 'Trimester', 'Credit', 'Grade', 'Point')
+
+# The open backend, set by open_store()
+_store = None
+# Write-behind buffers: state_id -> [first queued at, {(collection, _id): update or None}, stats]
+_write_buffers = {}
+_buffer_lock = threading.Lock()
+
+def open_store():
+    """Open the STATE_BACKEND store. MongoDB keeps connecting in the background."""
+    global _store
+    if _store is None:
+        _store = open_backend(config.STATE_BACKEND, config.MONGO_URI)
+    return _store
+
+def check_store():
+    """Wait until the store is usable and report the outcome. Returns False on failure."""
+    try:
+        return open_store().check()
+    except ValueError as e:
+        print(f"ERROR: {e}")
+    return False
+
+def close_store():
+    """Close the store if one was opened."""
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = None
+
+def _dhaka_now():
+    return (datetime.utcnow() + timedelta(hours=6)).replace(tzinfo=None).isoformat() + '+06:00'
+
+def course_doc_id(state_id, key):
+    """Return the _id of the per-course document for `key`."""
+    return '|'.join((state_id,) + normalize_key(key))
+
+def compact_course(course):
+    """Keep only the columns the bot reads back from a scraped row."""
+    return {field: course.get(field, '') for field in COURSE_FIELDS}
+
+def _course_write(state_id, key, status, course=None):
+    fields = {'state_id': state_id, 'key': list(normalize_key(key)), 'status': status, 'updated': _dhaka_now()}
+    if course is not None:
+        fields['course'] = compact_course(course)
+    return 'courses', course_doc_id(state_id, key), {'$set': fields}
+
+def _course_ops(state_id, tracked=(), notified=(), dropped=()):
+    ops = [_course_write(state_id, course_key(course), 'running', course) for course in tracked]
+    for item in notified:
+        if isinstance(item, dict):
+            ops.append(_course_write(state_id, course_key(item), 'notified', item))
+        else:
+            ops.append(_course_write(state_id, item, 'notified'))
+    ops.extend(('courses', course_doc_id(state_id, key), None) for key in dropped)
+    return ops
+
+def _bulk_write(ops, stats=None):
+    """Send buffered operations to the store in one batch."""
+    started = time.perf_counter()
+    with metrics.phase('persist'):
+        open_store().write(ops)
+    metrics.inc('ucam_state_writes_total', len(ops))
+    if stats is not None:
+        stats['state_writes'] += len(ops)
+        stats['state_write_batches'] += 1
+        stats['state_write_ms'] += (time.perf_counter() - started) * 1000
+        stats['state_write_bytes'] += sum(len(json.dumps(update)) for update in ops.values() if update is not None)
+
+def _queue_writes(state_id, ops, stats=None):
+    """Buffer ops for one account and write them once STATE_WRITE_BEHIND_SECONDS have passed.
+
+    A later write to the same document replaces an earlier one that has not
+    been sent yet. Callers hold the account's state_lock, so the writes for
+    one account go out in order.
+    """
+    now = time.monotonic()
+    with _buffer_lock:
+        if ops:
+            buffer = _write_buffers.setdefault(state_id, [now, {}, stats])
+            buffer[2] = buffer[2] or stats
+            for name, doc_id, update in ops:
+                buffer[1][(name, doc_id)] = update
+        buffer = _write_buffers.get(state_id)
+        if buffer is None or now - buffer[0] < config.STATE_WRITE_BEHIND_SECONDS:
+            return
+        del _write_buffers[state_id]
+    try:
+        _bulk_write(buffer[1], buffer[2])
+    except Exception as e:
+        print(f"Failed to save bot state to {config.STATE_BACKEND}: {e}")
+
+def flush_state_writes():
+    """Write every buffered change now (call before exiting)."""
+    with _buffer_lock:
+        buffers = list(_write_buffers.values())
+        _write_buffers.clear()
+    for _, ops, stats in buffers:
+        try:
+            _bulk_write(ops, stats)
+        except Exception as e:
+            print(f"Failed to save bot state to {config.STATE_BACKEND}: {e}")
+
+def _migrate_state_blob(state_id, doc):
+    """Split a whole-state document written by older versions into per-course documents."""
+    ops = _course_ops(state_id, doc.get('running_courses', []), doc.get('notified_courses', []))
+    ops.append(('bot_state', state_id, {'$unset': {'running_courses': '', 'notified_courses': ''}}))
+    _bulk_write({(name, doc_id): update for name, doc_id, update in ops})
+    print(f"📦 Moved {len(ops) - 1} courses of '{state_id}' to per-course state documents.")
+
+def load_bot_state(state_id='state'):
+    """Load persistent state from the store.
+
+    Returns dict with 'running_courses', 'notified_courses' (a set of
+    course_key() tuples), 'table_fingerprint' (hash of the last fully
+    processed course table) and 'publication_hours' (PollScheduler history,
+    or None).
+    """
+    state = {'running_courses': [], 'notified_courses': set(), 'table_fingerprint': None, 'publication_hours': None}
+    try:
+        store = open_store()
+        doc = store.get('bot_state', state_id, ('table_fingerprint', 'publication_hours', 'running_courses', 'notified_courses'))
+        if doc:
+            if 'running_courses' in doc or 'notified_courses' in doc:
+                _migrate_state_blob(state_id, doc)
+            state['table_fingerprint'] = doc.get('table_fingerprint')
+            state['publication_hours'] = doc.get('publication_hours')
+        for course_doc in store.find('courses', state_id, ('key', 'status', 'course')):
+            if course_doc['status'] == 'running':
+                state['running_courses'].append(course_doc['course'])
+            else:
+                state['notified_courses'].add(normalize_key(course_doc['key']))
+    except Exception as e:
+        print(f"Failed to load bot state from {config.STATE_BACKEND}: {e}")
+        return {'running_courses': [], 'notified_courses': set(), 'table_fingerprint': None, 'publication_hours': None}
+    return state
+
+def save_course_changes(account, tracked=(), notified=(), dropped=(), **fields):
+    """Record what changed for one account since the last save.
+
+    `tracked` are course rows now being watched, `notified` rows (or keys)
+    whose result was delivered, `dropped` keys no longer watched. Keyword
+    arguments such as table_fingerprint are set on the account's state
+    document. Each course is one small document, so a save costs the same
+    however long the history gets.
+    """
+    ops = _course_ops(account.state_id, tracked, notified, dropped)
+    if fields:
+        ops.append(('bot_state', account.state_id, {'$set': dict(fields, last_updated=_dhaka_now())}))
+    _queue_writes(account.state_id, ops, account.stats)
+
+def save_bot_state(running_courses, notified_courses, state_id='state', table_fingerprint=None):
+    """Save a complete state snapshot to the store."""
+    ops = _course_ops(state_id, running_courses, notified_courses)
+    ops.append(('bot_state', state_id, {'$set': {'table_fingerprint': table_fingerprint, 'last_updated': _dhaka_now()}}))
+    _queue_writes(state_id, ops)
+
+def save_account_state(account, state):
+    """Save the state dict returned by load_bot_state() for one account."""
+    save_course_changes(
+        account, state['running_courses'], state['notified_courses'],
+        table_fingerprint=state.get('table_fingerprint')
+    )
+
+def _session_cipher():
+    """Return a Fernet cipher for SESSION_KEY, or None if session reuse is disabled."""
+    if not config.SESSION_KEY:
+        return None
+    try:
+        from cryptography.fernet import Fernet
+        return Fernet(config.SESSION_KEY)
+    except ImportError:
+        print("⚠️ cryptography is not installed. Saved sessions are disabled.")
+    except ValueError as e:
+        print(f"⚠️ Invalid SESSION_KEY ({e}). Saved sessions are disabled.")
+    return None
+
+def save_session(account):
+    """Store the account's cookies and mmi, encrypted with SESSION_KEY."""
+    cipher = _session_cipher()
+    if cipher is None or _store is None:
+        return
+    payload = {
+        'mmi': account.mmi,
+        'cookies': [
+            {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path,
+             'secure': c.secure, 'expires': c.expires}
+            for c in account.session.cookies
+        ]
+    }
+    try:
+        _store.write({('sessions', account.state_id): {
+            '$set': {
+                'session': cipher.encrypt(json.dumps(payload).encode('utf-8')).decode('ascii'),
+                'last_validated': account.last_validated or time.time()
+            }
+        }})
+    except Exception as e:
+        print(f"Failed to save UCAM session to {config.STATE_BACKEND}: {e}")
+
+def restore_session(account):
+    """Load a saved session into the account. Returns True if one was restored.
+
+    The session is only assumed to work; the first fetch detects expiry and
+    logs in again if needed.
+    """
+    cipher = _session_cipher()
+    if cipher is None or _store is None:
+        return False
+    try:
+        doc = _store.get('sessions', account.state_id)
+    except Exception as e:
+        print(f"Failed to load UCAM session from {config.STATE_BACKEND}: {e}")
+        return False
+    if not doc or 'session' not in doc:
+        return False
+
+    age = time.time() - doc.get('last_validated', 0)
+    if age > config.SESSION_MAX_AGE_SECONDS:
+        return False
+
+    from cryptography.fernet import InvalidToken
+    try:
+        payload = json.loads(cipher.decrypt(doc['session'].encode('ascii')))
+    except InvalidToken:
+        print(f"⚠️ [{account.user_id}] Saved session could not be decrypted with SESSION_KEY. Ignoring it.")
+        return False
+
+    for cookie in payload['cookies']:
+        account.session.cookies.set(
+            cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+            secure=cookie['secure'], expires=cookie['expires']
+        )
+    account.mmi = payload['mmi']
+    account.logged_in = True
+    account.last_validated = doc['last_validated']
+    account.stats['sessions_restored'] += 1
+    print(f"♻️ [{account.user_id}] Reusing saved UCAM session (validated {age/60:.0f} min ago).")
+    return True